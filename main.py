@@ -1,10 +1,12 @@
-from utils.pipeline import LazyPipe
+from utils.pipeline import MultiPipe
 
 # Define the setup for the pipeline
 setup = True
 # Define the pipelines to run
 pipes = ["production"]
-for pipe in pipes:
-    print(f"Running {pipe} pipeline...")
-    lazypipe = LazyPipe(pipe=pipe)
-    lazypipe.magic(setup=setup)
+# Define how many pipelines are built and submitted at once
+max_concurrency = 2
+
+print(f"Running {', '.join(pipes)} pipelines...")
+multipipe = MultiPipe(pipes=pipes, max_concurrency=max_concurrency)
+multipipe.run(setup=setup)
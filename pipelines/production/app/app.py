@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from flask import Flask, jsonify, request, json
 import pandas as pd
 from predict import ModelPipeline
@@ -8,6 +9,12 @@ AIP_HEALTH_ROUTE = os.environ.get("AIP_HEALTH_ROUTE", "/health")
 AIP_PREDICT_ROUTE = os.environ.get("AIP_PREDICT_ROUTE", "/predict")
 
 
+@lru_cache(maxsize=None)
+def get_predictor() -> ModelPipeline:
+    """Model pipeline loaded on the first request and shared by the process."""
+    return ModelPipeline(transformer_path=os.environ.get("TRANSFORMER_PATH"))
+
+
 @app.route("/health")
 def health():
     """Health endpoint.
@@ -32,9 +39,9 @@ def predict():
         response: prediction response
     """
 
-    predictor = ModelPipeline()
+    predictor = get_predictor()
 
-    features_names = predictor.model.feature_names_in_.tolist()
+    features_names = predictor.input_columns
     instances = request.get_json()["instances"]
     data = pd.DataFrame(instances)[features_names]
     results = predictor.predict(data=data)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 import joblib
 from dataclasses import dataclass
 
@@ -8,22 +8,30 @@ class ModelPipeline:
     """Pipeline for prediction
     Args:
         model_path (str): Path to the model file
+        transformer_path (str): Path to the fitted PreprocessingTransformer, if any
 
     Attributes:
         model_path (str): Path to the model file
+        transformer_path (str): Path to the fitted PreprocessingTransformer, if any
+        transformer (PreprocessingTransformer): Preprocessing applied before inference
 
     Methods:
         load_model(): Load the model from disk
+        input_columns: Raw columns expected in the input data
         processing(data): Preprocess the data
         inference(data): Predict using the model
         postprocessing(prediction): Postprocess the prediction
         predict(data): Predict using the model
+        predict_batches(batches): Predict a stream of chunks
+        predict_keys(feature_cache, keys, snapshot_date): Predict cached features of entities
 
     Returns:
         output: Prediction output
     """
 
     model_path: str = "./model/model.joblib"
+    # Saved with joblib next to the model; unpickling needs the src package
+    transformer_path: Optional[str] = None
 
     def load_model(self):
         """Load model from disk"""
@@ -33,10 +41,26 @@ class ModelPipeline:
 
     def __post_init__(self):
         self.model = self.load_model()
+        self.transformer = (
+            joblib.load(self.transformer_path) if self.transformer_path else None
+        )
+
+    @property
+    def input_columns(self) -> List[str]:
+        """Raw columns expected in the input data"""
+        if self.transformer is not None:
+            # The model was trained on the transformer output, not on raw columns
+            return list(
+                self.transformer.numeric_columns_
+                + self.transformer.categorical_columns_
+            )
+        return self.model.feature_names_in_.tolist()
 
     def processing(self, data):
-        """Preprocess data"""
-        return data
+        """Preprocess data with the fitted transformer, if any"""
+        if self.transformer is None:
+            return data
+        return self.transformer.transform(data)
 
     def inference(self, data):
         """Predict using the model"""
@@ -54,3 +78,26 @@ class ModelPipeline:
         prediction = self.inference(data)
         output = self.postprocessing(prediction)
         return output
+
+    def predict_batches(self, batches: Iterable) -> Iterator:
+        """Predict a stream of chunks for batch scoring with bounded memory"""
+        for batch in batches:
+            yield self.predict(batch)
+
+    def predict_keys(self, feature_cache, keys: List, snapshot_date: str = None):
+        """Predict entities from their cached features, without recomputing them
+
+        Args:
+            feature_cache (FeatureCache): features precomputed by the pipeline
+            keys (list): entity keys
+            snapshot_date (str): snapshot of the features, all snapshots if None
+
+        Returns:
+            tuple: keys of the entities found and their predictions
+        """
+        features = feature_cache.lookup(keys, snapshot_date=snapshot_date)
+        found = features[feature_cache.key]
+        if found.empty:
+            return [], []
+        # Only the model inputs: the cache also holds the key, dates and target
+        return found.to_list(), self.predict(features[self.input_columns])
@@ -18,7 +18,11 @@ PIPELINE_NAME = (
     Path(__file__).resolve().parents[2].name
 )  # Match the directory name of pipeline
 COMPONENT_NAME = os.path.basename(os.path.dirname(__file__))  # Match the directory name
-BASE_IMAGE = f"{REGION}-docker.pkg.dev/{PROJECT_ID}/{REPOSITORY}/{PIPELINE_NAME}:latest"
+# Content hash tag of the image set by LazyPipe, latest otherwise
+IMAGE_TAG = os.environ.get("IMAGE_TAG", "latest")
+BASE_IMAGE = (
+    f"{REGION}-docker.pkg.dev/{PROJECT_ID}/{REPOSITORY}/{PIPELINE_NAME}:{IMAGE_TAG}"
+)
 
 
 @dsl.component(
@@ -75,7 +79,13 @@ def hyperparameter_tuning_component():
     print(f"Time taken: {time.time() - time_start} seconds")
 
 
+def compile_component():
+    """Compile the component to its yaml spec."""
+    COMPONENT_FILE = f"pipelines/{PIPELINE_NAME}/components/{COMPONENT_NAME}.yaml"
+    print(f"Compiling {COMPONENT_FILE}")
+    compiler.Compiler().compile(hyperparameter_tuning_component, COMPONENT_FILE)
+
+
 # Compile the component
-COMPONENT_FILE = f"pipelines/{PIPELINE_NAME}/components/{COMPONENT_NAME}.yaml"
-print(f"Compiling {COMPONENT_FILE}")
-compiler.Compiler().compile(hyperparameter_tuning_component, COMPONENT_FILE)
+if __name__ == "__main__":
+    compile_component()
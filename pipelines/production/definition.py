@@ -3,14 +3,11 @@ from pathlib import Path
 import random
 from kfp import compiler, dsl
 
-from utils.vertexai import vertex_authenticate
-
 # Import components
-from components.hyperparameter_tuning.definition import hyperparameter_tuning_component
-
-
-# Authenticate with Google Cloud SDK for Vertex AI
-aiplatform_client = vertex_authenticate()
+from components.hyperparameter_tuning.definition import (
+    compile_component as compile_hyperparameter_tuning_component,
+    hyperparameter_tuning_component,
+)
 
 # Define the pipeline
 PIPELINE_NAME = Path(__file__).resolve().parents[0].name
@@ -41,8 +38,13 @@ def pipeline():
     hyperparameter_tuning_component()
 
 
-# Compile the pipeline
-compiler.Compiler().compile(
-    pipeline_func=pipeline,
-    package_path=f"pipelines/{PIPELINE_NAME}/{PIPELINE_NAME}_pipeline.json",
-)
+# Compiling needs no authentication, LazyPipe compiles incrementally with utils.compiler
+if __name__ == "__main__":
+    # Compile the components
+    compile_hyperparameter_tuning_component()
+
+    # Compile the pipeline
+    compiler.Compiler().compile(
+        pipeline_func=pipeline,
+        package_path=f"pipelines/{PIPELINE_NAME}/{PIPELINE_NAME}_pipeline.json",
+    )
@@ -1,33 +1,38 @@
-from google.cloud.aiplatform import pipeline_jobs
 from pathlib import Path
 from datetime import datetime
 from dotenv import find_dotenv, load_dotenv
 import os
 
-# Load environment variables from .env file
-load_dotenv(find_dotenv())
-
 
 # Define the pipeline
 PIPELINE_NAME = Path(__file__).resolve().parents[0].name
 
 
-PROJECT_ID = os.environ.get("PROJECT_ID")
-REGION = os.environ.get("REGION")
-TIMESTAMP = datetime.now().strftime("%Y%m%d%H%M%S")
-# Define the pipeline
-PIPELINE_NAME = Path(__file__).resolve().parents[0].name
+def main():
+    """Submit the compiled pipeline to Vertex AI Pipelines."""
+    # Deferred so importing this module does not load the aiplatform SDK
+    from google.cloud.aiplatform import pipeline_jobs
+
+    # Load environment variables from .env file
+    load_dotenv(find_dotenv())
+
+    PROJECT_ID = os.environ.get("PROJECT_ID")
+    REGION = os.environ.get("REGION")
+    TIMESTAMP = datetime.now().strftime("%Y%m%d%H%M%S")
+
+    start_pipeline = pipeline_jobs.PipelineJob(
+        display_name=PIPELINE_NAME,
+        template_path=f"pipelines/{PIPELINE_NAME}/{PIPELINE_NAME}_pipeline.json",
+        enable_caching=False,
+        location=REGION,
+        project=PROJECT_ID,
+        job_id=f"{PIPELINE_NAME}-{TIMESTAMP}",
+    )
 
-start_pipeline = pipeline_jobs.PipelineJob(
-    display_name=PIPELINE_NAME,
-    template_path=f"pipelines/{PIPELINE_NAME}/{PIPELINE_NAME}_pipeline.json",
-    enable_caching=False,
-    location=REGION,
-    project=PROJECT_ID,
-    job_id=f"{PIPELINE_NAME}-{TIMESTAMP}",
-)
+    # Run the pipeline
+    # Note : Update Containter if new changes are made in src
+    start_pipeline.run()
 
 
-# Run the pipeline
-# Note : Update Containter if new changes are made in src
-start_pipeline.run()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def storage_client():
+    """Cloud Storage client of the pipeline code, created on the first call and shared.
+
+    Returns:
+        storage.Client: shared client
+    """
+    from google.cloud import storage
+
+    return storage.Client()
+
+
+@lru_cache(maxsize=None)
+def bigquery_client():
+    """BigQuery client of the pipeline code, created on the first call and shared.
+
+    Returns:
+        bigquery.Client: shared client
+    """
+    from google.cloud import bigquery
+
+    return bigquery.Client()
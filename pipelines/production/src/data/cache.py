@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import IO, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+
+def _cached_files(directory: str) -> list:
+    """Modification time, size and path of the files of a cache directory."""
+    entries = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.startswith("."):
+                # Temporary file of an in-flight write
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def directory_size(directory: str) -> int:
+    """Total size in bytes of the files of a cache directory."""
+    return sum(size for _, size, _ in _cached_files(directory))
+
+
+def evict_lru(directory: str, max_bytes: int, keep: tuple = ()) -> int:
+    """Delete the least recently used files until the directory fits max_bytes.
+
+    Recency is the file modification time, which readers refresh on every hit.
+
+    Args:
+        directory (str): cache directory
+        max_bytes (int): size budget of the directory
+        keep (tuple): paths that must not be evicted
+
+    Returns:
+        int: number of evicted files
+    """
+    entries = _cached_files(directory)
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Evicted by a concurrent reader
+            pass
+        total -= size
+        evicted += 1
+    return evicted
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters of a BlobCache.
+
+    Attributes:
+        hits (int): reads served from disk
+        misses (int): reads that downloaded the object
+        evictions (int): files removed to stay within the size budget
+        bytes_downloaded (int): bytes fetched from the source
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    bytes_downloaded: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+
+@dataclasses.dataclass
+class BlobCache:
+    """Read-through local disk cache for Cloud Storage objects.
+
+    Entries are keyed on the object name plus its generation and etag, so a
+    new upload of the same object is a miss while unchanged objects are read
+    from disk. Files are written to a temporary name and renamed into place,
+    so concurrent readers, threads or processes, never see a partial file.
+    Another process may still evict a file after `fetch` returned it: `open`
+    downloads it again in that case, and an open file survives eviction.
+
+    The size of the cache is tracked in memory from a single scan at
+    construction, and the directory is only scanned again to evict once the
+    tracked size goes over the budget. Files written by other processes are
+    counted at that next scan.
+
+    The source can be a `storage.Bucket` or a local directory, e.g. the /gcs/
+    FUSE mount or a directory standing in for the bucket in tests, where the
+    modification time and size play the role of generation and etag.
+
+    Attributes:
+        cache_dir (str): local directory of the cache
+        max_bytes (int): size budget of the cache, least recently used files are evicted
+        stats (CacheStats): hit and miss counters
+
+    Methods:
+        fetch(name, bucket): local path of an object, downloaded on a miss
+        open(name, bucket): open the cached copy of an object, safe against eviction
+        clear(): remove all cached files
+    """
+
+    cache_dir: str
+    max_bytes: int = 10 * 1024**3
+    stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+
+    def __post_init__(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = directory_size(self.cache_dir)
+
+    def _entry(self, source: str, name: str, version: str) -> str:
+        key = hashlib.sha256(f"{source}/{name}#{version}".encode()).hexdigest()
+        extension = os.path.splitext(name)[1]
+        return os.path.join(self.cache_dir, key[:2], f"{key}{extension}")
+
+    def fetch(self, name: str, bucket: Union[storage.Bucket, str] = None) -> str:
+        """Local path of an object, downloaded on a miss.
+
+        Args:
+            name (str): object name, or a local path when bucket is None
+            bucket (Union[storage.Bucket, str]): bucket or local directory of the object
+
+        Returns:
+            str: path of the cached copy
+        """
+        if bucket is None or isinstance(bucket, str):
+            source_path = os.path.join(bucket or "", name)
+            stat = os.stat(source_path)
+            entry = self._entry(
+                bucket or "", name, f"{stat.st_mtime_ns}:{stat.st_size}"
+            )
+        else:
+            # One metadata request to resolve the current generation
+            blob = bucket.get_blob(name)
+            if blob is None:
+                raise FileNotFoundError(f"gs://{bucket.name}/{name}")
+            entry = self._entry(
+                f"gs://{bucket.name}", name, f"{blob.generation}:{blob.etag}"
+            )
+
+        try:
+            # Refresh recency for the LRU policy
+            os.utime(entry)
+            with self._lock:
+                self.stats.hits += 1
+            return entry
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry), prefix=".")
+        os.close(fd)
+        try:
+            if bucket is None or isinstance(bucket, str):
+                shutil.copyfile(source_path, tmp_path)
+            else:
+                blob.download_to_filename(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, entry)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.bytes_downloaded += size
+            self._size += size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            evicted = evict_lru(self.cache_dir, self.max_bytes, keep=(entry,))
+            size = directory_size(self.cache_dir)
+            with self._lock:
+                self.stats.evictions += evicted
+                self._size = size
+        return entry
+
+    def open(
+        self, name: str, bucket: Union[storage.Bucket, str] = None, retries: int = 2
+    ) -> IO[bytes]:
+        """Open the cached copy of an object for reading.
+
+        A file evicted by another process between `fetch` and the open is
+        downloaded again. Once open, the file stays readable even if evicted.
+
+        Args:
+            name (str): object name, or a local path when bucket is None
+            bucket (Union[storage.Bucket, str]): bucket or local directory of the object
+            retries (int): downloads attempted again after an eviction
+
+        Returns:
+            IO[bytes]: binary file object of the cached copy
+        """
+        for attempt in range(retries + 1):
+            path = self.fetch(name, bucket)
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                if attempt == retries:
+                    raise
+
+    def clear(self) -> None:
+        """Remove all cached files."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            self._size = 0
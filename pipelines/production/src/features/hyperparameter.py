@@ -1,7 +1,445 @@
-from dataclasses import dataclass
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from sklearn.base import BaseEstimator
+
+
+@dataclass
+class TrialQueue:
+    """File-based work queue of tuning trials.
+
+    Each trial is a JSON file that moves between the `pending`, `running` and
+    `done` directories. Workers claim a trial with an atomic rename, so any
+    number of processes sharing the directory (a local path or the /gcs/ FUSE
+    mount on a Vertex custom job) can pull from the same queue.
+
+    Attributes:
+        path (str): root directory of the queue
+
+    Methods:
+        put(params): add a trial to the queue
+        claim(worker_id): claim the next pending trial
+        complete(trial, result): store the result of a claimed trial
+        requeue(worker_id, older_than): put running trials back in the queue
+        results(): list the results of all completed trials
+        pending(): number of trials not yet claimed
+        mark_submitted(): record that all trials have been submitted
+        wait_submitted(timeout, poll_interval): wait for the submitted marker
+        clear(): remove the trials and the submitted marker
+    """
+
+    path: str
+
+    def __post_init__(self):
+        for state in ("pending", "running", "done"):
+            os.makedirs(os.path.join(self.path, state), exist_ok=True)
+
+    def _state(self, state: str, trial_id: str = "") -> str:
+        return os.path.join(self.path, state, f"{trial_id}.json" if trial_id else "")
+
+    def put(self, params: dict) -> str:
+        """Add a trial to the queue.
+
+        Args:
+            params (dict): hyperparameters of the trial
+
+        Returns:
+            str: id of the trial
+        """
+        trial_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        # Write under a temporary name so workers never read a partial trial
+        tmp_path = self._state("pending", f".{trial_id}")
+        with open(tmp_path, "w") as file:
+            json.dump({"trial_id": trial_id, "params": params}, file)
+        os.replace(tmp_path, self._state("pending", trial_id))
+        return trial_id
+
+    def claim(self, worker_id: str) -> Optional[dict]:
+        """Claim the next pending trial.
+
+        Args:
+            worker_id (str): id of the claiming worker
+
+        Returns:
+            dict: claimed trial, None if the queue is empty
+        """
+        for name in sorted(os.listdir(self._state("pending"))):
+            if name.startswith("."):
+                continue
+            trial_id = name[: -len(".json")]
+            try:
+                os.rename(
+                    self._state("pending", trial_id), self._state("running", trial_id)
+                )
+            except FileNotFoundError:
+                # Claimed by another worker in the meantime
+                continue
+            with open(self._state("running", trial_id)) as file:
+                trial = json.load(file)
+            trial["worker_id"] = worker_id
+            # Record the owner; the rewrite also stamps the claim time
+            tmp_path = self._state("running", f".{trial_id}")
+            with open(tmp_path, "w") as file:
+                json.dump(trial, file)
+            os.replace(tmp_path, self._state("running", trial_id))
+            return trial
+        return None
+
+    def complete(self, trial: dict, result: dict) -> None:
+        """Store the result of a claimed trial.
+
+        Args:
+            trial (dict): trial returned by `claim`
+            result (dict): score and timing of the trial
+        """
+        trial_id = trial["trial_id"]
+        tmp_path = self._state("done", f".{trial_id}")
+        with open(tmp_path, "w") as file:
+            json.dump({**trial, **result}, file)
+        os.replace(tmp_path, self._state("done", trial_id))
+        try:
+            os.remove(self._state("running", trial_id))
+        except FileNotFoundError:
+            # Requeued as stale while this worker was still evaluating it
+            pass
+
+    def requeue(self, worker_id: str = None, older_than: float = None) -> List[str]:
+        """Put running trials back in the queue, e.g. those of a dead worker.
+
+        Args:
+            worker_id (str): requeue the trials claimed by this worker
+            older_than (float): requeue the trials claimed more than this many
+                seconds ago
+
+        Returns:
+            list: ids of the requeued trials
+        """
+        requeued = []
+        for name in sorted(os.listdir(self._state("running"))):
+            if name.startswith("."):
+                continue
+            trial_id = name[: -len(".json")]
+            path = self._state("running", trial_id)
+            try:
+                with open(path) as file:
+                    owner = json.load(file).get("worker_id")
+                age = time.time() - os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if (worker_id is not None and owner == worker_id) or (
+                older_than is not None and age > older_than
+            ):
+                try:
+                    os.rename(path, self._state("pending", trial_id))
+                except FileNotFoundError:
+                    continue
+                requeued.append(trial_id)
+        if requeued:
+            print(f"Requeued {len(requeued)} running trials: {requeued}")
+        return requeued
+
+    def results(self) -> List[dict]:
+        """List the results of all completed trials."""
+        results = []
+        for name in sorted(os.listdir(self._state("done"))):
+            if name.startswith("."):
+                continue
+            with open(os.path.join(self._state("done"), name)) as file:
+                results.append(json.load(file))
+        return results
+
+    def pending(self) -> int:
+        """Number of trials not yet claimed."""
+        return len(
+            [n for n in os.listdir(self._state("pending")) if not n.startswith(".")]
+        )
+
+    def mark_submitted(self) -> None:
+        """Record that all trials have been submitted."""
+        open(os.path.join(self.path, "SUBMITTED"), "w").close()
+
+    def wait_submitted(self, timeout: float = None, poll_interval: float = 1.0):
+        """Wait until the trials have been submitted.
+
+        Args:
+            timeout (float): maximum number of seconds to wait
+            poll_interval (float): seconds between checks
+
+        Raises:
+            TimeoutError: if the trials are not submitted in time
+        """
+        time_start = time.time()
+        while not os.path.exists(os.path.join(self.path, "SUBMITTED")):
+            if timeout is not None and time.time() - time_start > timeout:
+                raise TimeoutError(f"No trials submitted to {self.path}")
+            time.sleep(poll_interval)
+
+    def clear(self) -> None:
+        """Remove the trials and the submitted marker, e.g. of an earlier run."""
+        marker = os.path.join(self.path, "SUBMITTED")
+        if os.path.exists(marker):
+            os.remove(marker)
+        for state in ("pending", "running", "done"):
+            for name in os.listdir(self._state(state)):
+                try:
+                    os.remove(os.path.join(self._state(state), name))
+                except FileNotFoundError:
+                    pass
 
 
 @dataclass
 class Hyperparameter:
-    # Define your class attributes here
-    pass
+    """Distributed hyperparameter tuning over a trial queue.
+
+    The coordinator samples candidate configurations from the search space and
+    puts them in a `TrialQueue`. Independent workers pull trials, fit and score
+    them with cross-validation and report the results back to the queue.
+    Locally the workers are processes; on a Vertex custom job with N replicas
+    every replica calls `run_replica` against a queue on the /gcs/ mount: the
+    chief replica submits, evaluates and collects, the other replicas wait for
+    the submission and evaluate. Each run has its own queue under
+    `queue_path/run_id`, so a run never sees the marker or the trials of an
+    earlier one.
+
+    Attributes:
+        estimator (BaseEstimator): model to tune
+        param_distributions (dict): search space
+        queue_path (str): root directory of the trial queues
+        run_id (str): id of the run, shared by its replicas; defaults to the
+            id of the Vertex custom job, or a new id locally
+        n_iter (int): number of sampled configurations
+        cv (int): number of cross-validation folds
+        scoring (str): scoring metric
+        random_state (int): seed for sampling the search space
+        poll_interval (float): seconds between queue checks while collecting
+
+    Methods:
+        submit(): put the sampled configurations in the queue
+        work(X, y): pull and evaluate trials until the queue is empty
+        collect(timeout, stale_after, X, y): wait for all trials and return the results
+        run(X, y, n_workers): submit, evaluate in local worker processes and collect
+        run_replica(X, y, timeout, stale_after): entrypoint of a replica of a custom job
+
+    Returns:
+        dict: best hyperparameters
+    """
+
+    estimator: BaseEstimator
+    param_distributions: dict
+    queue_path: str
+    n_iter: int = 10
+    cv: int = 5
+    scoring: str = "roc_auc"
+    random_state: int = None
+    poll_interval: float = 1.0
+    run_id: str = None
+    queue: TrialQueue = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.run_id is None:
+            self.run_id = os.environ.get("CLOUD_ML_JOB_ID") or (
+                f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            )
+        self.queue = TrialQueue(path=os.path.join(self.queue_path, self.run_id))
+        self.trial_ids: List[str] = []
+        self.best_params_: Dict = None
+        self.best_score_: float = None
+        self.results_: List[dict] = []
+
+    def submit(self) -> List[str]:
+        """Put the sampled configurations in the queue.
+
+        Returns:
+            list: ids of the submitted trials
+        """
+        from sklearn.model_selection import ParameterSampler
+
+        sampler = ParameterSampler(
+            self.param_distributions,
+            n_iter=self.n_iter,
+            random_state=self.random_state,
+        )
+        # A rerun under the same run id starts from an empty queue
+        self.queue.clear()
+        # Cast numpy scalars so the trials serialize to JSON
+        self.trial_ids = [
+            self.queue.put(
+                {k: v.item() if isinstance(v, np.generic) else v for k, v in p.items()}
+            )
+            for p in sampler
+        ]
+        self.queue.mark_submitted()
+        print(f"Submitted {len(self.trial_ids)} trials to {self.queue.path}")
+        return self.trial_ids
+
+    def work(self, X: pd.DataFrame, y: np.array, worker_id: str = None) -> int:
+        """Pull and evaluate trials until the queue is empty.
+
+        Args:
+            X (pd.DataFrame): input features
+            y (np.array): target variable
+            worker_id (str): id of the worker, defaults to the process id
+
+        Returns:
+            int: number of trials evaluated by this worker
+        """
+        from sklearn.base import clone
+        from sklearn.model_selection import cross_val_score
+
+        worker_id = worker_id or f"{os.uname().nodename}-{os.getpid()}"
+        evaluated = 0
+        while (trial := self.queue.claim(worker_id)) is not None:
+            time_start = time.time()
+            model = clone(self.estimator).set_params(**trial["params"])
+            try:
+                scores = cross_val_score(model, X, y, cv=self.cv, scoring=self.scoring)
+                result = {"score": float(np.mean(scores)), "std": float(np.std(scores))}
+            except Exception as error:
+                result = {"score": None, "error": repr(error)}
+            result["seconds"] = time.time() - time_start
+            self.queue.complete(trial, result)
+            evaluated += 1
+            print(f"Worker {worker_id} finished trial {trial['trial_id']}: {result}")
+        return evaluated
+
+    def collect(
+        self,
+        timeout: float = None,
+        stale_after: float = None,
+        X: pd.DataFrame = None,
+        y: np.array = None,
+    ) -> List[dict]:
+        """Wait for all submitted trials and return the results.
+
+        The results gathered so far are kept in `results_`, also on timeout.
+
+        Args:
+            timeout (float): maximum number of seconds to wait
+            stale_after (float): requeue trials running for longer than this,
+                e.g. claimed by a replica that died
+            X (pd.DataFrame): input features, to evaluate pending trials such
+                as requeued ones while waiting
+            y (np.array): target variable
+
+        Returns:
+            list: results of the trials, best score first
+
+        Raises:
+            TimeoutError: if trials are still running after timeout
+        """
+        time_start = time.time()
+        while True:
+            if stale_after is not None:
+                self.queue.requeue(older_than=stale_after)
+            if X is not None:
+                self.work(X, y, worker_id=f"collector-{os.getpid()}")
+            results = self.queue.results()
+            if self.trial_ids:
+                results = [r for r in results if r["trial_id"] in self.trial_ids]
+            self._rank(results)
+            if len(results) >= len(self.trial_ids):
+                break
+            if timeout is not None and time.time() - time_start > timeout:
+                raise TimeoutError(
+                    f"{len(self.trial_ids) - len(results)} trials still running, "
+                    f"{len(results)} results in results_"
+                )
+            time.sleep(self.poll_interval)
+        return self.results_
+
+    def _rank(self, results: List[dict]) -> None:
+        scored = [r for r in results if r.get("score") is not None]
+        scored.sort(key=lambda r: r["score"], reverse=True)
+        if scored:
+            self.best_params_ = scored[0]["params"]
+            self.best_score_ = scored[0]["score"]
+        self.results_ = scored + [r for r in results if r.get("score") is None]
+
+    def run(self, X: pd.DataFrame, y: np.array, n_workers: int = None) -> dict:
+        """Submit the trials, evaluate them in local worker processes and collect.
+
+        Args:
+            X (pd.DataFrame): input features
+            y (np.array): target variable
+            n_workers (int): number of worker processes, defaults to the cpu count
+
+        Returns:
+            dict: best hyperparameters
+        """
+        self.submit()
+        n_workers = min(n_workers or os.cpu_count() or 1, len(self.trial_ids))
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=self.work, args=(X, y, f"local-{i}"))
+            for i in range(n_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for i, worker in enumerate(workers):
+            if worker.exitcode != 0:
+                print(f"Worker local-{i} died with exit code {worker.exitcode}")
+                self.queue.requeue(worker_id=f"local-{i}")
+        # Evaluate the trials of dead workers in this process
+        self.collect(timeout=0, X=X, y=y)
+        print(f"Best score {self.best_score_} with {self.best_params_}")
+        return self.best_params_
+
+    def run_replica(
+        self,
+        X: pd.DataFrame,
+        y: np.array,
+        timeout: float = None,
+        stale_after: float = None,
+    ) -> Optional[dict]:
+        """Entrypoint of every replica of a Vertex custom job.
+
+        The chief replica submits the trials, evaluates them along with the
+        other replicas and collects the results, requeueing and evaluating the
+        trials of replicas that died. The other replicas wait for the
+        submission and evaluate trials until the queue is empty.
+
+        Args:
+            X (pd.DataFrame): input features
+            y (np.array): target variable
+            timeout (float): maximum number of seconds to wait for the
+                submission, or for the results on the chief
+            stale_after (float): seconds after which the chief requeues a
+                running trial, longer than the slowest trial
+
+        Returns:
+            dict: best hyperparameters on the chief, None on the other replicas
+        """
+        index = replica_index()
+        worker_id = f"replica-{index}-{os.getpid()}"
+        if index != 0:
+            self.queue.wait_submitted(timeout, self.poll_interval)
+            self.work(X, y, worker_id)
+            return None
+
+        self.submit()
+        self.work(X, y, worker_id)
+        self.collect(timeout=timeout, stale_after=stale_after, X=X, y=y)
+        print(f"Best score {self.best_score_} with {self.best_params_}")
+        return self.best_params_
+
+
+def replica_index() -> int:
+    """Index of the current replica on a Vertex custom job, 0 when run locally."""
+    cluster_spec = json.loads(os.environ.get("CLUSTER_SPEC", "{}"))
+    task = cluster_spec.get("task", {})
+    if task.get("type", "workerpool0") == "workerpool0":
+        return 0
+    return int(task.get("index", 0)) + 1
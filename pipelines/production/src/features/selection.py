@@ -1,10 +1,15 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
-from typing import Union
+from typing import TYPE_CHECKING, Union
 import numpy as np
 import pandas as pd
-from probatus.feature_elimination import ShapRFECV
-from sklearn.base import BaseEstimator
-from sklearn.model_selection import RandomizedSearchCV
+
+if TYPE_CHECKING:
+    from sklearn.base import BaseEstimator
+    from sklearn.model_selection import RandomizedSearchCV
+
+    from src.features.store import FeatureCache
 
 
 @dataclass
@@ -20,6 +25,10 @@ class FeatureEliminationShap:
         standard_error_threshold (float): standard error threshold
         return_type (str): return type
         num_features (Union[int, str]): number of features to return
+        optimize_dtypes (bool): compact the dtypes of X with DtypeOptimizer before fitting
+        feature_cache (FeatureCache): cached features read by run when X is None
+        snapshot_date (str): snapshot of the cached features
+        target (str): column of the cached features holding y
 
     Methods:
         run(X, y): fit the model
@@ -37,17 +46,49 @@ class FeatureEliminationShap:
     standard_error_threshold: float = 0.5
     return_type: str = "feature_names"
     num_features: Union[int, str] = "best"
+    optimize_dtypes: bool = False
+    feature_cache: FeatureCache = None
+    snapshot_date: str = None
+    target: str = None
 
-    def run(self, X: pd.DataFrame, y: np.array) -> pd.DataFrame:
+    def run(self, X: pd.DataFrame = None, y: np.array = None) -> pd.DataFrame:
         """Run the feature elimination process.
 
         Args:
-            X (pd.DataFrame): input features
-            y (np.array): target variable
+            X (pd.DataFrame): input features, read from feature_cache if None
+            y (np.array): target variable, the target column of the cached
+                features if None
 
         Returns:
             list: reduced feature set
         """
+        if X is None:
+            if self.feature_cache is None:
+                raise ValueError("Pass X or set feature_cache to read it from")
+            if y is None and self.target is None:
+                raise ValueError("Pass y or set target to read it from the cache")
+            # Features precomputed by an earlier stage, indexed by entity key
+            X = self.feature_cache.read(self.snapshot_date).set_index(
+                self.feature_cache.key
+            )
+            # All snapshots are read without a snapshot_date: not a feature
+            X = X.drop(columns=[self.feature_cache.date_column], errors="ignore")
+            if y is None:
+                if self.target not in X.columns:
+                    raise ValueError(f"Target {self.target} is not a cached column")
+                y = X.pop(self.target).to_numpy()
+            else:
+                X = X.drop(columns=[self.target], errors="ignore")
+
+        if self.optimize_dtypes and isinstance(X, pd.DataFrame):
+            # Half the memory per fit: float32 inputs and downcast integers
+            from src.processing.dtypes import DtypeOptimizer
+
+            X = DtypeOptimizer().fit_transform(X)
+
+        # Deferred: probatus pulls in shap and its plotting stack
+        from probatus.feature_elimination import ShapRFECV
+
         shap_elimination = ShapRFECV(
             model=self.model,
             step=self.step,
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import hashlib
+import inspect
+import os
+import shutil
+import uuid
+from glob import glob
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import dataset as ds
+from pyarrow import parquet as pq
+
+Date = Union[str, datetime.date]
+
+
+def feature_version(*code) -> str:
+    """Version of the feature code: a hash of its source.
+
+    Only the code computing the features is hashed, so editing a consumer
+    such as the tuner or the feature selection does not invalidate the cache.
+
+    Args:
+        code: functions, classes or modules computing the features
+
+    Returns:
+        str: short hex digest
+    """
+    if not code:
+        raise ValueError("feature_version needs the code computing the features")
+    digest = hashlib.sha256()
+    for obj in code:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()[:12]
+
+
+@dataclasses.dataclass
+class FeatureCache:
+    """Cache of computed feature sets as Parquet partitions.
+
+    A feature set is written once per snapshot date under
+    `<root>/<name>/version=<version>/snapshot_date=<date>/`, sorted by the
+    entity key, so that the row group statistics let point lookups and key
+    range scans skip most of the data. The version is a hash of the code
+    computing the features by default: changing that code makes the cache
+    miss instead of serving stale features. The root is a local directory or the bucket's
+    data/05_features directory in /gcs/ notation on the FUSE mount.
+
+    Attributes:
+        name (str): name of the feature set
+        root (str): directory of the feature sets
+        key (str): entity key column
+        version (str): version of the feature code, a hash of `code` if None
+        code (Sequence): functions, classes or modules computing the features
+        row_group_size (int): rows per Parquet row group, the unit of a lookup read
+
+    Methods:
+        has(snapshot_date): whether the features of a snapshot are cached
+        write(data, snapshot_date): cache the features of a snapshot
+        get_or_compute(snapshot_date, compute): read, or compute and cache
+        read(snapshot_date, columns): features of a snapshot, or of all of them
+        lookup(keys, snapshot_date, columns): rows of some entities
+        scan(start, end, ...): stream rows of a key and date range in chunks
+        clear_stale(): delete the features of the other versions
+    """
+
+    name: str
+    root: str = "data/05_features"
+    key: str = "entity_id"
+    version: str = None
+    code: Sequence = ()
+    row_group_size: int = 65_536
+
+    # Name of the partition column of the snapshot dates
+    date_column = "snapshot_date"
+
+    def __post_init__(self):
+        if self.version is None:
+            if not self.code:
+                raise ValueError("FeatureCache needs a version or the feature code")
+            self.version = feature_version(*self.code)
+
+    @property
+    def path(self) -> str:
+        """Directory of the current version of the feature set."""
+        return os.path.join(self.root, self.name, f"version={self.version}")
+
+    def _partition(self, snapshot_date: Date) -> str:
+        return os.path.join(self.path, f"{self.date_column}={snapshot_date}")
+
+    def has(self, snapshot_date: Date) -> bool:
+        """Whether the features of a snapshot are cached for the current version."""
+        return bool(glob(os.path.join(self._partition(snapshot_date), "*.parquet")))
+
+    def write(self, data: pd.DataFrame, snapshot_date: Date) -> str:
+        """Cache the features of a snapshot, replacing any cached ones.
+
+        Args:
+            data (pd.DataFrame): features with the key column
+            snapshot_date (Date): date of the snapshot
+
+        Returns:
+            str: path of the Parquet file
+        """
+        if self.key not in data.columns:
+            raise ValueError(f"Features must have the key column {self.key}")
+        table = pa.Table.from_pandas(
+            data.drop(columns=[self.date_column], errors="ignore"),
+            preserve_index=False,
+        ).sort_by(self.key)
+
+        partition = self._partition(snapshot_date)
+        os.makedirs(partition, exist_ok=True)
+        stale = glob(os.path.join(partition, "*.parquet"))
+        # Written under a hidden name then renamed: readers skip files starting
+        # with "." and never see a partial file
+        path = os.path.join(partition, f"part-{uuid.uuid4().hex}.parquet")
+        tmp_path = os.path.join(partition, f".{os.path.basename(path)}")
+        pq.write_table(table, tmp_path, row_group_size=self.row_group_size)
+        os.replace(tmp_path, path)
+        for stale_path in stale:
+            os.remove(stale_path)
+        print(f"Cached {table.num_rows} rows of {self.name} in {partition}")
+        return path
+
+    def get_or_compute(
+        self, snapshot_date: Date, compute: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Features of a snapshot, computed and cached on a miss.
+
+        Args:
+            snapshot_date (Date): date of the snapshot
+            compute (Callable): function computing the features with the key column
+
+        Returns:
+            pd.DataFrame: features of the snapshot
+        """
+        if self.has(snapshot_date):
+            print(f"Feature cache hit: {self.name} {snapshot_date} ({self.version})")
+            return self.read(snapshot_date)
+        print(f"Feature cache miss: {self.name} {snapshot_date} ({self.version})")
+        data = compute()
+        self.write(data, snapshot_date)
+        return data
+
+    def _dataset(self) -> Optional[ds.Dataset]:
+        """Dataset of the current version, None until its first write."""
+        if not os.path.isdir(self.path):
+            return None
+        partitioning = ds.partitioning(
+            pa.schema([(self.date_column, pa.string())]), flavor="hive"
+        )
+        return ds.dataset(
+            self.path,
+            format="parquet",
+            partitioning=partitioning,
+            exclude_invalid_files=True,
+        )
+
+    def _empty(
+        self, dataset: Optional[ds.Dataset], snapshot_date=None, columns=None
+    ) -> pd.DataFrame:
+        """No rows, with the cached columns when the version has been written."""
+        if dataset is None:
+            if columns is None:
+                columns = [self.key]
+                if snapshot_date is None:
+                    columns.append(self.date_column)
+            return pd.DataFrame(columns=columns)
+        data = dataset.schema.empty_table().to_pandas()
+        if columns is not None:
+            return data[columns]
+        if snapshot_date is not None:
+            data = data.drop(columns=[self.date_column])
+        return data
+
+    def _filter(
+        self, snapshot_date=None, start=None, end=None, date_from=None, date_to=None
+    ) -> ds.Expression:
+        expressions = []
+        date = ds.field(self.date_column)
+        if snapshot_date is not None:
+            expressions.append(date == str(snapshot_date))
+        if date_from is not None:
+            expressions.append(date >= str(date_from))
+        if date_to is not None:
+            expressions.append(date <= str(date_to))
+        if start is not None:
+            expressions.append(ds.field(self.key) >= start)
+        if end is not None:
+            expressions.append(ds.field(self.key) < end)
+        expression = None
+        for condition in expressions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def read(self, snapshot_date: Date = None, columns: list = None) -> pd.DataFrame:
+        """Features of a snapshot, or of all snapshots with their date.
+
+        Args:
+            snapshot_date (Date): date of the snapshot, all snapshots if None
+            columns (list): columns to read, defaults to all
+
+        Returns:
+            pd.DataFrame: cached features
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return self._empty(dataset, snapshot_date, columns)
+        table = dataset.to_table(columns=columns, filter=self._filter(snapshot_date))
+        data = table.to_pandas()
+        if snapshot_date is not None and columns is None:
+            data = data.drop(columns=[self.date_column])
+        return data
+
+    def lookup(
+        self, keys: Iterable, snapshot_date: Date = None, columns: list = None
+    ) -> pd.DataFrame:
+        """Rows of some entities, reading only the row groups that can hold them.
+
+        Args:
+            keys (Iterable): entity keys
+            snapshot_date (Date): date of the snapshot, all snapshots if None
+            columns (list): columns to read, defaults to all
+
+        Returns:
+            pd.DataFrame: rows of the entities found, none before the first write
+        """
+        keys = list(keys)
+        dataset = self._dataset()
+        if not keys or dataset is None:
+            return self._empty(dataset, snapshot_date, columns)
+        expression = ds.field(self.key).isin(keys)
+        # Range bounds prune row groups by their statistics, isin alone does not
+        expression &= self._filter(snapshot_date, start=min(keys)) & (
+            ds.field(self.key) <= max(keys)
+        )
+        data = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        if snapshot_date is not None and columns is None:
+            data = data.drop(columns=[self.date_column])
+        return data
+
+    def scan(
+        self,
+        start=None,
+        end=None,
+        date_from: Date = None,
+        date_to: Date = None,
+        columns: list = None,
+        batch_size: int = 65_536,
+    ) -> Iterator[pd.DataFrame]:
+        """Stream the rows of a key range and a date range in chunks.
+
+        Args:
+            start: first key, included
+            end: last key, excluded
+            date_from (Date): first snapshot date, included
+            date_to (Date): last snapshot date, included
+            columns (list): columns to read, defaults to all
+            batch_size (int): maximum number of rows per chunk
+
+        Yields:
+            pd.DataFrame: chunks of at most batch_size rows
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return
+        scanner = dataset.scanner(
+            columns=columns,
+            filter=self._filter(
+                start=start, end=end, date_from=date_from, date_to=date_to
+            ),
+            batch_size=batch_size,
+            batch_readahead=1,
+            fragment_readahead=1,
+        )
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def clear_stale(self) -> List[str]:
+        """Delete the features cached by the other versions of the feature code.
+
+        Returns:
+            list: deleted version directories
+        """
+        stale = [
+            path
+            for path in glob(os.path.join(self.root, self.name, "version=*"))
+            if os.path.basename(path) != f"version={self.version}"
+        ]
+        for path in stale:
+            shutil.rmtree(path)
+        return stale
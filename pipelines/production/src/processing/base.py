@@ -1,12 +1,253 @@
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 
 
 class PreprocessingTransformer(BaseEstimator, TransformerMixin):
-    def __init__(self):
-        pass
+    """Impute, scale and encode tabular data with statistics fitted in chunks.
+
+    Numeric columns are imputed and standardized with a running count, mean and
+    sum of squared deviations per column, merged chunk by chunk, so `partial_fit`
+    over the batches of `DataLoader.stream` fits data bigger than memory.
+    Categorical columns are encoded one-hot or as ordinal codes against the
+    categories seen while fitting; unknown and missing values are all zeros, or
+    -1 as codes. The fitted statistics are NumPy arrays, so the transformer is
+    light to pickle with joblib alongside the model.
+
+    Args:
+        numeric_columns (list): numeric columns, inferred from the dtypes if None
+        categorical_columns (list): categorical columns, the other columns if None
+        impute (str): "mean" or "constant" imputation of the numeric columns
+        fill_value (float): value imputed with the "constant" strategy
+        scale (bool): standardize the numeric columns
+        encoding (str): "onehot" or "ordinal" encoding of the categorical columns
+        dtype: dtype of the output array
+
+    Attributes:
+        numeric_columns_ (list): fitted numeric columns
+        categorical_columns_ (list): fitted categorical columns
+        n_samples_seen_ (np.ndarray): non-missing values per numeric column
+        mean_ (np.ndarray): mean per numeric column
+        var_ (np.ndarray): variance per numeric column
+        scale_ (np.ndarray): scaling factor per numeric column
+        categories_ (list): categories per categorical column, in order of appearance
+
+    Methods:
+        partial_fit(X): update the statistics with a chunk
+        fit(X): fit the statistics on data in memory
+        fit_batches(batches): fit the statistics on a stream of chunks
+        transform(X): preprocess data into a single NumPy array
+        transform_batches(batches): transform a stream of chunks
+        get_feature_names_out(): names of the output columns
+    """
+
+    def __init__(
+        self,
+        numeric_columns: Optional[List[str]] = None,
+        categorical_columns: Optional[List[str]] = None,
+        impute: str = "mean",
+        fill_value: float = 0.0,
+        scale: bool = True,
+        encoding: str = "onehot",
+        dtype=np.float64,
+    ):
+        self.numeric_columns = numeric_columns
+        self.categorical_columns = categorical_columns
+        self.impute = impute
+        self.fill_value = fill_value
+        self.scale = scale
+        self.encoding = encoding
+        self.dtype = dtype
+
+    @staticmethod
+    def _frame(X) -> pd.DataFrame:
+        # Arrays are wrapped without copy, their columns named by position
+        return X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+
+    def _reset(self) -> None:
+        for attribute in ("numeric_columns_", "categorical_columns_", "mean_"):
+            if hasattr(self, attribute):
+                delattr(self, attribute)
+
+    def _init_statistics(self, X: pd.DataFrame) -> None:
+        if self.impute not in ("mean", "constant"):
+            raise ValueError(f"Unknown impute strategy {self.impute}")
+        if self.encoding not in ("onehot", "ordinal"):
+            raise ValueError(f"Unknown encoding {self.encoding}")
+
+        numeric = self.numeric_columns
+        if numeric is None:
+            numeric = [
+                c
+                for c in X.select_dtypes(include=["number", "bool"]).columns
+                if c not in (self.categorical_columns or [])
+            ]
+        categorical = self.categorical_columns
+        if categorical is None:
+            categorical = [c for c in X.columns if c not in numeric]
+
+        self.numeric_columns_ = list(numeric)
+        self.categorical_columns_ = list(categorical)
+        self.n_samples_seen_ = np.zeros(len(numeric), dtype=np.int64)
+        self.mean_ = np.zeros(len(numeric), dtype=np.float64)
+        self._m2 = np.zeros(len(numeric), dtype=np.float64)
+        self.categories_ = [np.array([], dtype=object) for _ in categorical]
+
+    def partial_fit(self, X, y=None):
+        """Update the fitted statistics with a chunk of data.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): chunk of input data
+            y: ignored
+
+        Returns:
+            PreprocessingTransformer: self
+        """
+        X = self._frame(X)
+        if not hasattr(self, "mean_"):
+            self._init_statistics(X)
+
+        if self.numeric_columns_:
+            values = X[self.numeric_columns_].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            count = np.count_nonzero(~np.isnan(values), axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+                m2 = np.nansum((values - mean) ** 2, axis=0)
+                # Merge the chunk statistics with the running ones (Chan et al.)
+                total = self.n_samples_seen_ + count
+                delta = mean - self.mean_
+                ratio = np.where(total > 0, count / total, 0.0)
+                self.mean_ += delta * ratio
+                self._m2 += m2 + delta**2 * self.n_samples_seen_ * ratio
+            self.n_samples_seen_ = total
+
+        for i, column in enumerate(self.categorical_columns_):
+            seen = pd.unique(X[column].dropna().to_numpy())
+            self.categories_[i] = pd.unique(
+                np.concatenate([self.categories_[i], seen.astype(object)])
+            )
+
+        self._finalize()
+        return self
+
+    def _finalize(self) -> None:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.var_ = np.where(
+                self.n_samples_seen_ > 0, self._m2 / self.n_samples_seen_, 0.0
+            )
+        self.scale_ = np.sqrt(self.var_)
+        self.scale_[self.scale_ == 0] = 1.0
+        center = self.mean_ if self.scale else np.zeros_like(self.mean_)
+        scale = self.scale_ if self.scale else np.ones_like(self.scale_)
+        fill = (
+            self.mean_
+            if self.impute == "mean"
+            else np.full_like(self.mean_, self.fill_value)
+        )
+        # Offsets applied in place by transform, imputed values already scaled
+        self._center, self._scale = center, scale
+        self._fill = (fill - center) / scale
 
     def fit(self, X, y=None):
+        """Fit the statistics on data in memory.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): input data
+            y: ignored
+
+        Returns:
+            PreprocessingTransformer: self
+        """
+        self._reset()
+        return self.partial_fit(X)
+
+    def fit_batches(self, batches: Iterable):
+        """Fit the statistics on a stream of chunks, e.g. from `DataLoader.stream`.
+
+        Args:
+            batches (Iterable): chunks of input data
+
+        Returns:
+            PreprocessingTransformer: self
+        """
+        self._reset()
+        for batch in batches:
+            self.partial_fit(batch)
         return self
 
-    def transform(self, X):
-        return X
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        """Names of the output columns.
+
+        Returns:
+            np.ndarray: numeric columns, then the encoded categorical columns
+        """
+        names = [str(c) for c in self.numeric_columns_]
+        for column, categories in zip(self.categorical_columns_, self.categories_):
+            if self.encoding == "onehot":
+                names += [f"{column}={category}" for category in categories]
+            else:
+                names.append(str(column))
+        return np.array(names, dtype=object)
+
+    def transform(self, X) -> np.ndarray:
+        """Preprocess data into a single array.
+
+        The output is allocated once; the numeric columns are copied into it
+        and imputed and scaled in place, the categories are looked up with a
+        hash table per column.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): input data
+
+        Returns:
+            np.ndarray: numeric columns, then the encoded categorical columns
+        """
+        X = self._frame(X)
+        n_numeric = len(self.numeric_columns_)
+        widths = [len(c) if self.encoding == "onehot" else 1 for c in self.categories_]
+        output = np.empty((len(X), n_numeric + sum(widths)), dtype=self.dtype)
+
+        numeric = output[:, :n_numeric]
+        for j, column in enumerate(self.numeric_columns_):
+            values = X[column]
+            # Nullable extension dtypes need their missing values as NaN
+            if isinstance(values.dtype, np.dtype):
+                numeric[:, j] = values.to_numpy()
+            else:
+                numeric[:, j] = values.to_numpy(dtype=self.dtype, na_value=np.nan)
+        missing = np.isnan(numeric)
+        numeric -= self._center.astype(self.dtype)
+        numeric /= self._scale.astype(self.dtype)
+        np.copyto(numeric, np.broadcast_to(self._fill, numeric.shape), where=missing)
+
+        offset = n_numeric
+        for column, categories, width in zip(
+            self.categorical_columns_, self.categories_, widths
+        ):
+            # -1 for unknown and missing values
+            codes = pd.Index(categories).get_indexer(X[column])
+            if self.encoding == "onehot":
+                block = output[:, offset : offset + width]
+                block[:] = 0
+                rows = np.flatnonzero(codes >= 0)
+                block[rows, codes[rows]] = 1
+            else:
+                output[:, offset] = codes
+            offset += width
+        return output
+
+    def transform_batches(self, batches: Iterable) -> Iterator:
+        """Transform a stream of chunks, e.g. from `DataLoader.stream`.
+
+        Args:
+            batches (Iterable): chunks of input data
+
+        Yields:
+            transformed chunks, one at a time
+        """
+        for batch in batches:
+            yield self.transform(batch)
@@ -0,0 +1,163 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Candidate integer dtypes, smallest first
+_SIGNED = (np.int8, np.int16, np.int32, np.int64)
+_UNSIGNED = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def _like(dtype: np.dtype, original) -> object:
+    """The nullable pandas counterpart of a NumPy dtype for nullable columns."""
+    if isinstance(original, np.dtype):
+        return dtype
+    name = dtype.name.replace("uint", "UInt").replace("int", "Int")
+    return pd.api.types.pandas_dtype(name.replace("float", "Float"))
+
+
+def memory_mb(X: pd.DataFrame) -> float:
+    """Memory of a DataFrame in MB, object values included."""
+    return X.memory_usage(index=True, deep=True).sum() / 1e6
+
+
+class DtypeOptimizer(BaseEstimator, TransformerMixin):
+    """Compact the dtypes of a DataFrame and restore them on the way out.
+
+    Integers are downcast to the smallest dtype holding the fitted range,
+    floats to `float_dtype` and strings with few distinct values to
+    categoricals. A chunk whose integers fall outside the fitted range keeps
+    a dtype wide enough for them, so the conversion is always lossless for
+    integers and categories; floats keep the precision of `float_dtype`.
+    `inverse_transform` restores the original dtypes, e.g. before
+    `BigQueryConf.create_table_from_pandas`.
+
+    Args:
+        float_dtype: dtype of the float columns, float32 for model inputs,
+            None to keep them
+        max_cardinality (float): largest ratio of distinct values to rows of a
+            string column turned into a categorical
+        verbose (bool): print the memory before and after each transform
+
+    Attributes:
+        dtypes_ (dict): original dtype of each column
+        target_dtypes_ (dict): optimized dtype of the converted columns
+        memory_ (dict): memory in MB before and after the last verbose transform
+
+    Methods:
+        fit(X): choose the dtype of each column
+        transform(X): convert the columns to their optimized dtype
+        inverse_transform(X): convert the columns back to their original dtype
+    """
+
+    def __init__(
+        self,
+        float_dtype=np.float32,
+        max_cardinality: float = 0.5,
+        verbose: bool = True,
+    ):
+        self.float_dtype = float_dtype
+        self.max_cardinality = max_cardinality
+        self.verbose = verbose
+
+    @staticmethod
+    def _integer_dtype(minimum, maximum) -> np.dtype:
+        candidates = _UNSIGNED if minimum >= 0 else _SIGNED
+        for dtype in candidates:
+            info = np.iinfo(dtype)
+            if info.min <= minimum and maximum <= info.max:
+                return np.dtype(dtype)
+        return np.dtype(candidates[-1])
+
+    def fit(self, X: pd.DataFrame, y=None):
+        """Choose the optimized dtype of each column.
+
+        Args:
+            X (pd.DataFrame): input data
+            y: ignored
+
+        Returns:
+            DtypeOptimizer: self
+        """
+        self.dtypes_: Dict[str, object] = X.dtypes.to_dict()
+        self.target_dtypes_: Dict[str, object] = {}
+        for column, dtype in self.dtypes_.items():
+            values = X[column]
+            if pd.api.types.is_bool_dtype(dtype):
+                continue
+            if pd.api.types.is_integer_dtype(dtype) and values.notna().any():
+                target = self._integer_dtype(values.min(), values.max())
+                if target.itemsize < dtype.itemsize:
+                    self.target_dtypes_[column] = _like(target, dtype)
+            elif pd.api.types.is_float_dtype(dtype) and self.float_dtype is not None:
+                if np.dtype(self.float_dtype).itemsize < dtype.itemsize:
+                    self.target_dtypes_[column] = _like(
+                        np.dtype(self.float_dtype), dtype
+                    )
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(
+                dtype
+            ):
+                # Only columns of strings: mixed objects are left untouched
+                if pd.api.types.infer_dtype(values, skipna=True) != "string":
+                    continue
+                if values.nunique() <= self.max_cardinality * len(values):
+                    categories = pd.unique(values.dropna())
+                    self.target_dtypes_[column] = pd.CategoricalDtype(categories)
+        return self
+
+    def _convert(self, values: pd.Series, target) -> pd.Series:
+        if isinstance(target, pd.CategoricalDtype):
+            # Values unseen by fit would be lost: add them as categories
+            unseen = pd.unique(values[values.notna() & ~values.isin(target.categories)])
+            if len(unseen):
+                target = pd.CategoricalDtype(list(target.categories) + list(unseen))
+            return values.astype(target)
+        if pd.api.types.is_integer_dtype(target) and values.notna().any():
+            # Change dtype when the chunk leaves the fitted range
+            info = np.iinfo(getattr(target, "numpy_dtype", target))
+            minimum, maximum = values.min(), values.max()
+            if minimum < info.min or maximum > info.max:
+                target = _like(self._integer_dtype(minimum, maximum), target)
+        return values.astype(target)
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Convert the columns to their optimized dtype.
+
+        Args:
+            X (pd.DataFrame): input data
+
+        Returns:
+            pd.DataFrame: data with compact dtypes
+        """
+        converted = {
+            column: self._convert(X[column], target)
+            for column, target in self.target_dtypes_.items()
+            if column in X.columns
+        }
+        # Shallow copy: the unconverted columns are shared with the input
+        output = X.copy(deep=False)
+        for column, values in converted.items():
+            output[column] = values
+        if self.verbose:
+            # A deep memory count scans every object value: only when reporting
+            self.memory_ = {"before": memory_mb(X), "after": memory_mb(output)}
+            before, after = self.memory_["before"], self.memory_["after"]
+            saved = 100 * (1 - after / before) if before else 0.0
+            print(f"Memory: {before:.1f} MB -> {after:.1f} MB ({saved:.0f}% saved)")
+        return output
+
+    def inverse_transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Convert the columns back to their original dtype.
+
+        Args:
+            X (pd.DataFrame): data with compact dtypes
+
+        Returns:
+            pd.DataFrame: data with the original dtypes
+        """
+        output = X.copy(deep=False)
+        for column in self.target_dtypes_:
+            if column in X.columns:
+                output[column] = X[column].astype(self.dtypes_[column])
+        return output
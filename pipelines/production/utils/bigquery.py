@@ -1,27 +1,115 @@
-from dataclasses import dataclass
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+import datetime
+from functools import lru_cache
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
 import pandas as pd
-from google.cloud import bigquery
-from typing import List
+import pyarrow as pa
+from pyarrow import parquet as pq
+import threading
+from typing import TYPE_CHECKING, Iterator, List, Tuple
 from pathlib import Path
-from google.cloud.bigquery.job import LoadJobConfig, WriteDisposition
 from jinja2 import Template  # pylint: disable=E0401
 
+from src.clients import bigquery_client
+from src.data.cache import CacheStats, evict_lru
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+
+@lru_cache(maxsize=128)
+def _compile_template(input_file: str, mtime_ns: int) -> Template:
+    """Compiled template of a file, cached until the file is modified."""
+    with open(input_file, "r", encoding="utf-8") as f:
+        return Template(f.read())
+
 
 def generate_query(input_file: Path, **replacements) -> str:
     """
     Read input file and replace placeholder using Jinja.
 
+    The compiled template is cached and only re-read when the file changes.
+
     Args:
         input_file (Path): input file to read
         replacements: keyword arguments to use to replace placeholders
     Returns:
         str: replaced content of input file
     """
+    input_file = os.path.abspath(input_file)
+    template = _compile_template(input_file, os.stat(input_file).st_mtime_ns)
 
-    with open(input_file, "r", encoding="utf-8") as f:
-        query_template = f.read()
+    return template.render(**replacements)
+
+
+def _bigquery_field(name: str, arrow_type: pa.DataType) -> bigquery.SchemaField:
+    """
+    Map an Arrow field to a BigQuery schema field.
+
+    Args:
+        name (str): The name of the field.
+        arrow_type (pa.DataType): The Arrow type of the field.
 
-    return Template(query_template).render(**replacements)
+    Returns:
+        bigquery.SchemaField: The BigQuery schema field.
+    """
+    from google.cloud import bigquery
+
+    mode = "NULLABLE"
+    if pa.types.is_dictionary(arrow_type):
+        # Categoricals are stored as their values
+        arrow_type = arrow_type.value_type
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        mode, arrow_type = "REPEATED", arrow_type.value_type
+    if pa.types.is_struct(arrow_type):
+        fields = [_bigquery_field(field.name, field.type) for field in arrow_type]
+        return bigquery.SchemaField(name, "RECORD", mode=mode, fields=fields)
+
+    if pa.types.is_boolean(arrow_type):
+        field_type = "BOOL"
+    elif pa.types.is_integer(arrow_type):
+        field_type = "INT64"
+    elif pa.types.is_floating(arrow_type):
+        field_type = "FLOAT64"
+    elif pa.types.is_decimal(arrow_type):
+        fits_numeric = arrow_type.precision <= 38 and arrow_type.scale <= 9
+        field_type = "NUMERIC" if fits_numeric else "BIGNUMERIC"
+    elif pa.types.is_timestamp(arrow_type):
+        field_type = "TIMESTAMP"
+    elif pa.types.is_date(arrow_type):
+        field_type = "DATE"
+    elif pa.types.is_time(arrow_type):
+        field_type = "TIME"
+    elif pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        field_type = "BYTES"
+    else:
+        # Strings, all-null columns and anything without a native equivalent
+        field_type = "STRING"
+    return bigquery.SchemaField(name, field_type, mode=mode)
+
+
+def infer_schema(df: pd.DataFrame) -> List[bigquery.SchemaField]:
+    """
+    Infer a BigQuery schema from the Arrow types of a pandas DataFrame.
+
+    Args:
+        df (pd.DataFrame): The pandas DataFrame.
+
+    Returns:
+        List[bigquery.SchemaField]: The schema of the table.
+    """
+    arrow_schema = pa.Schema.from_pandas(df, preserve_index=False)
+    return [_bigquery_field(field.name, field.type) for field in arrow_schema]
 
 
 @dataclass
@@ -75,10 +163,17 @@ class BigQueryConf:
     Configuration for BigQuery operations.
 
     Args:
-        client (bigquery.Client): The BigQuery client.
+        client (bigquery.Client): The BigQuery client. Defaults to the shared process-wide client, created on first use.
     """
 
-    client: bigquery.Client = bigquery.Client()
+    client: bigquery.Client = None
+
+    @property
+    def bq_client(self) -> bigquery.Client:
+        """The client, the shared one is created on first use rather than at construction."""
+        if self.client is None:
+            self.client = bigquery_client()
+        return self.client
 
     def create_dataset(self, dataset_id: str) -> bigquery.Dataset:
         """
@@ -90,9 +185,11 @@ class BigQueryConf:
         Returns:
             bigquery.Dataset: The created dataset.
         """
-        dataset_ref = self.client.dataset(dataset_id)
+        from google.cloud import bigquery
+
+        dataset_ref = self.bq_client.dataset(dataset_id)
         dataset = bigquery.Dataset(dataset_ref)
-        dataset = self.client.create_dataset(dataset)  # API request
+        dataset = self.bq_client.create_dataset(dataset)  # API request
         print(f"Created dataset {dataset.project}.{dataset.dataset_id}")
         return dataset
 
@@ -106,7 +203,9 @@ class BigQueryConf:
         Returns:
             bigquery.Table: The created table.
         """
-        table_ref = self.client.dataset(config.dataset_id).table(config.table_id)
+        from google.cloud import bigquery
+
+        table_ref = self.bq_client.dataset(config.dataset_id).table(config.table_id)
         table = bigquery.Table(table_ref, schema=config.schema)
         if config.partitioning_field:
             table.time_partitioning = bigquery.TimePartitioning(
@@ -114,7 +213,7 @@ class BigQueryConf:
                 field=config.partitioning_field,
                 require_partition_filter=True,
             )
-        table = self.client.create_table(table)
+        table = self.bq_client.create_table(table)
         return table
 
     def create_table_from_pandas(
@@ -131,23 +230,9 @@ class BigQueryConf:
             bigquery.Table: The created table.
         """
         if config.schema is None:
-            pandas_dtype_to_bigquery_dtype = {
-                "int64": "INT64",
-                "float64": "FLOAT64",
-                "bool": "BOOL",
-                "datetime64[ns]": "TIMESTAMP",
-                "object": "STRING",
-            }
-            config.schema = [
-                bigquery.SchemaField(
-                    name, pandas_dtype_to_bigquery_dtype[str(df[name].dtype)]
-                )
-                for name in df.columns
-            ]
+            config.schema = infer_schema(df)
         table = self.create_table(config)
-        job_config = bigquery.LoadJobConfig(schema=config.schema)
-        job = self.client.load_table_from_dataframe(df, table, job_config=job_config)
-        job.result()  # Wait for the job to complete
+        self.bulk_load(df, config)
         return table
 
     def create_external_table(self, config: ExternalTableConfig) -> bigquery.Table:
@@ -160,8 +245,10 @@ class BigQueryConf:
         Returns:
             bigquery.Table: The created table.
         """
+        from google.cloud import bigquery
+
         # Construct a BigQuery table reference
-        table_ref = self.client.dataset(config.dataset_id).table(config.table_id)
+        table_ref = self.bq_client.dataset(config.dataset_id).table(config.table_id)
         # Create the external config
         external_config = bigquery.ExternalConfig(config.format)
         external_config.source_uris = [config.data_uri]
@@ -170,7 +257,7 @@ class BigQueryConf:
         # Create the table
         table = bigquery.Table(table_ref, schema=config.schema)
         table.external_data_configuration = external_config
-        table = self.client.create_table(table)  # API request
+        table = self.bq_client.create_table(table)  # API request
         print(f"Created table {table.project}.{table.dataset_id}.{table.table_id}")
         return table
 
@@ -185,17 +272,139 @@ class BigQueryConf:
         Returns:
             bigquery.Table: The updated table.
         """
-        table_ref = self.client.dataset(config.dataset_id).table(config.table_id)
+        return self.bulk_load(df, config)
+
+    def bulk_load(
+        self,
+        df: pd.DataFrame,
+        config: TableConfig,
+        chunk_rows: int = 1_000_000,
+        max_workers: int = 4,
+    ) -> bigquery.Table:
+        """
+        Append a pandas DataFrame to a table in Parquet chunks loaded concurrently.
+
+        Each slice of the frame is converted to Arrow and serialized to
+        Parquet in a worker thread, so besides the frame at most max_workers
+        chunks are held in memory at a time.
+
+        Several chunks are loaded into a staging table first, then appended to
+        the table with a single copy job: the append is all or nothing, and a
+        retry after a failed chunk does not duplicate the chunks already loaded.
+
+        Args:
+            df (pd.DataFrame): The pandas DataFrame to append to the table.
+            config (TableConfig): The configuration for the table.
+            chunk_rows (int, optional): The number of rows per load job. Defaults to 1,000,000.
+            max_workers (int, optional): The number of concurrent load jobs. Defaults to 4.
+
+        Returns:
+            bigquery.Table: The updated table.
+        """
+        from google.cloud.bigquery.job import CopyJobConfig, WriteDisposition
+
+        time_start = time.time()
+        if len(df) <= chunk_rows:
+            # A single load job is atomic already
+            rows, jobs = self._load_chunks(df, config, chunk_rows, max_workers)
+        else:
+            # Same schema and partitioning as the table, or the copy is rejected
+            staging = replace(
+                config,
+                table_id=f"{config.table_id}_staging_{uuid.uuid4().hex[:8]}",
+                schema=config.schema or infer_schema(df),
+            )
+            staging_ref = self.bq_client.dataset(staging.dataset_id).table(
+                staging.table_id
+            )
+            try:
+                self.create_table(staging)
+                rows, jobs = self._load_chunks(df, staging, chunk_rows, max_workers)
+                self.bq_client.copy_table(
+                    staging_ref,
+                    self.bq_client.dataset(config.dataset_id).table(config.table_id),
+                    job_config=CopyJobConfig(
+                        write_disposition=WriteDisposition.WRITE_APPEND
+                    ),
+                ).result()
+            finally:
+                self.bq_client.delete_table(staging_ref, not_found_ok=True)
+        seconds = time.time() - time_start
+        print(
+            f"Loaded {rows} rows in {jobs} jobs into {config.dataset_id}.{config.table_id}"
+            f" in {seconds:.2f}s - {rows / max(seconds, 1e-9):.0f} rows/s"
+        )
+
+        table_ref = self.bq_client.dataset(config.dataset_id).table(config.table_id)
+        table = self.bq_client.get_table(table_ref)  # Get the updated table
+        return table
+
+    def load_dataframe(self, df: pd.DataFrame, config: TableConfig) -> int:
+        """
+        Append a pandas DataFrame to a table with a single Parquet load job.
+
+        Unlike bulk_load, the table is not fetched afterwards, so frequent
+        small appends cost one API request each.
+
+        Args:
+            df (pd.DataFrame): The pandas DataFrame to append to the table.
+            config (TableConfig): The configuration for the table.
+
+        Returns:
+            int: The number of loaded rows.
+        """
+        rows, _ = self._load_chunks(df, config, max(len(df), 1), 1)
+        return rows
+
+    def _load_chunks(
+        self, df: pd.DataFrame, config: TableConfig, chunk_rows: int, max_workers: int
+    ) -> Tuple[int, int]:
+        """
+        Run the Parquet load jobs of bulk_load without fetching the table afterwards.
+
+        Returns:
+            Tuple[int, int]: The number of loaded rows and of load jobs.
+        """
+        from google.cloud.bigquery.job import (
+            LoadJobConfig,
+            SourceFormat,
+            WriteDisposition,
+        )
+
+        from google.cloud.bigquery.format_options import ParquetOptions
+
+        table_ref = self.bq_client.dataset(config.dataset_id).table(config.table_id)
+        # Read Parquet lists as REPEATED fields, as infer_schema declares them
+        parquet_options = ParquetOptions()
+        parquet_options.enable_list_inference = True
         job_config = LoadJobConfig(
             schema=config.schema,
+            source_format=SourceFormat.PARQUET,
             write_disposition=WriteDisposition.WRITE_APPEND,
         )
-        job = self.client.load_table_from_dataframe(
-            df, table_ref, job_config=job_config
-        )
-        job.result()  # Wait for the job to complete
-        table = self.client.get_table(table_ref)  # Get the updated table
-        return table
+        job_config.parquet_options = parquet_options
+        # Types inferred on the whole frame, so that every chunk agrees on them
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+        def load(offset: int) -> int:
+            # Only the chunks in flight are converted to Arrow
+            chunk = pa.Table.from_pandas(
+                df.iloc[offset : offset + chunk_rows],
+                schema=schema,
+                preserve_index=False,
+            )
+            buffer = io.BytesIO()
+            pq.write_table(chunk, buffer)
+            job = self.bq_client.load_table_from_file(
+                buffer, table_ref, job_config=job_config, rewind=True
+            )
+            job.result()  # Wait for the job to complete
+            return chunk.num_rows
+
+        offsets = range(0, len(df), chunk_rows)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rows = sum(executor.map(load, offsets))
+        return rows, len(offsets)
 
     def delete_table(self, config: TableConfig) -> None:
         """
@@ -204,8 +413,8 @@ class BigQueryConf:
         Args:
             config (TableConfig): The configuration for the table.
         """
-        table_ref = self.client.dataset(config.dataset_id).table(config.table_id)
-        self.client.delete_table(table_ref)
+        table_ref = self.bq_client.dataset(config.dataset_id).table(config.table_id)
+        self.bq_client.delete_table(table_ref)
 
     def delete_dataset(self, dataset_id: str) -> None:
         """
@@ -214,5 +423,471 @@ class BigQueryConf:
         Args:
             dataset_id (str): The ID of the dataset.
         """
-        dataset_ref = self.client.dataset(dataset_id)
-        self.client.delete_dataset(dataset_ref, delete_contents=True, not_found_ok=True)
+        dataset_ref = self.bq_client.dataset(dataset_id)
+        self.bq_client.delete_dataset(
+            dataset_ref, delete_contents=True, not_found_ok=True
+        )
+
+
+@dataclass
+class TableAppender:
+    """
+    Buffered appender of pandas DataFrames to a BigQuery table.
+
+    Small appends are collected in memory and merged into one load job by a
+    background thread when the buffered rows, bytes or the age of the oldest
+    buffered append reach their threshold. Failed batches are recorded in
+    `errors`, raised by the `flush` that waited for them and by `close`.
+
+    Args:
+        config (TableConfig): The configuration of the table to append to.
+        conf (BigQueryConf, optional): The BigQuery operations. Defaults to one on the shared client.
+        max_rows (int, optional): Buffered rows that trigger a flush. Defaults to 100,000.
+        max_bytes (int, optional): Buffered bytes that trigger a flush. Defaults to 64 MiB.
+        max_latency (float, optional): Seconds an append may wait in the buffer. Defaults to 10.
+    """
+
+    config: TableConfig
+    conf: BigQueryConf = None
+    max_rows: int = 100_000
+    max_bytes: int = 64 * 1024**2
+    max_latency: float = 10.0
+
+    def __post_init__(self):
+        if self.conf is None:
+            self.conf = BigQueryConf()
+        self.errors: List[Tuple[int, Exception]] = []
+        self._buffer: List[pd.DataFrame] = []
+        self._rows = 0
+        self._bytes = 0
+        self._first_append = None
+        self._flush_requested = False
+        self._in_flight = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Add rows to the buffer.
+
+        Args:
+            df (pd.DataFrame): The rows to append to the table.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot append to a closed TableAppender")
+            first = not self._buffer
+            if first:
+                self._first_append = time.monotonic()
+            self._buffer.append(df)
+            self._rows += len(df)
+            # Deep: strings count with their payload, not as 8-byte pointers
+            self._bytes += int(df.memory_usage(index=False, deep=True).sum())
+            # The first append re-arms the latency timeout of the idle thread
+            if first or self._rows >= self.max_rows or self._bytes >= self.max_bytes:
+                self._condition.notify_all()
+
+    def _drain(self) -> None:
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: not self._buffer and not self._in_flight)
+
+    def _raise(self, errors: List[Tuple[int, Exception]]) -> None:
+        if errors:
+            rows = sum(rows for rows, _ in errors)
+            raise RuntimeError(
+                f"{len(errors)} batches ({rows} rows) failed to load into "
+                f"{self.config.dataset_id}.{self.config.table_id}: {errors[0][1]!r}"
+            ) from errors[0][1]
+
+    def flush(self) -> None:
+        """
+        Load the buffered rows, wait until the load job has finished and raise
+        on the batches that failed since the flush started.
+        """
+        with self._condition:
+            start = len(self.errors)
+        self._drain()
+        with self._condition:
+            errors = self.errors[start:]
+        self._raise(errors)
+
+    def close(self) -> None:
+        """
+        Flush the buffer, stop the background thread and raise on failed batches.
+        """
+        try:
+            self._drain()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
+        self._raise(self.errors)
+
+    def __enter__(self) -> "TableAppender":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _due(self) -> bool:
+        if not self._buffer:
+            return False
+        return (
+            self._flush_requested
+            or self._rows >= self.max_rows
+            or self._bytes >= self.max_bytes
+            or time.monotonic() - self._first_append >= self.max_latency
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._due():
+                    if self._closed:
+                        return
+                    if not self._buffer:
+                        # Nothing left to flush: release waiting flush() calls
+                        self._flush_requested = False
+                        self._condition.notify_all()
+                    timeout = None
+                    if self._buffer:
+                        age = time.monotonic() - self._first_append
+                        timeout = max(self.max_latency - age, 0)
+                    self._condition.wait(timeout)
+                frames, self._buffer = self._buffer, []
+                self._rows, self._bytes = 0, 0
+                self._in_flight = True
+
+            df = pd.concat(frames, ignore_index=True)
+            try:
+                self.conf.load_dataframe(df, self.config)
+                error = None
+            except Exception as exception:
+                print(f"Failed to load {len(df)} rows: {exception!r}")
+                error = exception
+
+            with self._condition:
+                if error is not None:
+                    self.errors.append((len(df), error))
+                self._in_flight = False
+                self._condition.notify_all()
+
+
+@dataclass
+class PartitionReader:
+    """
+    Partition-parallel reader of a time-partitioned table or query into Arrow.
+
+    The requested range is split along the partitions of the table, each
+    partition is fetched as Arrow record batches by its own query in a thread
+    pool and retried on its own on failure. At most max_workers partitions are
+    held in memory at a time.
+
+    Args:
+        config (TableConfig): The configuration of the table, with partitioning_field set.
+        conf (BigQueryConf, optional): The BigQuery operations. Defaults to one on the shared client.
+        query (str, optional): A query to split instead of the table. It must return the partitioning field. Defaults to None.
+        columns (List[str], optional): The columns to read. Defaults to all.
+        max_workers (int, optional): The number of partitions fetched concurrently. Defaults to 4.
+        retries (int, optional): The number of retries of a failed partition. Defaults to 3.
+    """
+
+    config: TableConfig
+    conf: BigQueryConf = None
+    query: str = None
+    columns: List[str] = None
+    max_workers: int = 4
+    retries: int = 3
+
+    def __post_init__(self):
+        if self.conf is None:
+            self.conf = BigQueryConf()
+        if not self.config.partitioning_field:
+            raise ValueError(
+                f"Table {self.config.dataset_id}.{self.config.table_id} has no partitioning_field"
+            )
+
+    def partitions(self, start, end) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Split a range into partition ranges.
+
+        Args:
+            start: The first partition to read, inclusive.
+            end: The end of the range, exclusive.
+
+        Returns:
+            List[Tuple[pd.Timestamp, pd.Timestamp]]: The lower and upper bound of each partition.
+        """
+        partitioning_type_to_freq = {
+            "HOUR": "h",
+            "DAY": "D",
+            "MONTH": "MS",
+            "YEAR": "YS",
+        }
+        freq = partitioning_type_to_freq[self.config.partitioning_type]
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        # Align the start on the beginning of its partition
+        first = start.to_period(freq.rstrip("S")).start_time
+        bounds = list(pd.date_range(first, end, freq=freq, inclusive="left")) + [end]
+        bounds[0] = start
+        return [
+            (lower, upper) for lower, upper in zip(bounds, bounds[1:]) if lower < upper
+        ]
+
+    def _fetch(self, lower: pd.Timestamp, upper: pd.Timestamp) -> List[pa.RecordBatch]:
+        """
+        Fetch one partition as record batches, retrying on failure.
+        """
+        from google.cloud import bigquery
+
+        field = self.config.partitioning_field
+        field_type = self.config.partitioning_field_type
+        source = (
+            f"({self.query})"
+            if self.query
+            else f"`{self.config.dataset_id}.{self.config.table_id}`"
+        )
+        columns = ", ".join(f"`{column}`" for column in self.columns or []) or "*"
+        sql = f"SELECT {columns} FROM {source} WHERE `{field}` >= @lower AND `{field}` < @upper"
+
+        def bound(value: pd.Timestamp):
+            if field_type == "DATE":
+                return value.date()
+            if field_type == "TIMESTAMP" and value.tzinfo is None:
+                return value.tz_localize("UTC").to_pydatetime()
+            return value.to_pydatetime()
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("lower", field_type, bound(lower)),
+                bigquery.ScalarQueryParameter("upper", field_type, bound(upper)),
+            ]
+        )
+        for attempt in range(self.retries + 1):
+            try:
+                job = self.conf.bq_client.query(sql, job_config=job_config)
+                return list(job.result().to_arrow_iterable())
+            except Exception as error:
+                if attempt == self.retries:
+                    raise
+                print(f"Retrying partition [{lower}, {upper}) after {error!r}")
+                time.sleep(2**attempt)
+
+    def stream(self, start, end) -> Iterator[pa.RecordBatch]:
+        """
+        Stream the record batches of a range, partition by partition in order.
+
+        Args:
+            start: The first partition to read, inclusive.
+            end: The end of the range, exclusive.
+
+        Yields:
+            pa.RecordBatch: The record batches of each partition.
+        """
+        partitions = iter(self.partitions(start, end))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Keep at most max_workers partitions fetched or in flight
+            pending = deque(
+                executor.submit(self._fetch, *partition)
+                for _, partition in zip(range(self.max_workers), partitions)
+            )
+            while pending:
+                batches = pending.popleft().result()
+                next_partition = next(partitions, None)
+                if next_partition is not None:
+                    pending.append(executor.submit(self._fetch, *next_partition))
+                yield from batches
+
+    def read(self, start, end) -> pa.Table:
+        """
+        Read a range into a single Arrow table.
+
+        Args:
+            start: The first partition to read, inclusive.
+            end: The end of the range, exclusive.
+
+        Returns:
+            pa.Table: The rows of the range.
+        """
+        time_start = time.time()
+        batches = list(self.stream(start, end))
+        table = pa.Table.from_batches(batches) if batches else pa.table({})
+        seconds = time.time() - time_start
+        print(
+            f"Read {table.num_rows} rows from {len(self.partitions(start, end))} partitions"
+            f" in {seconds:.2f}s - {table.num_rows / max(seconds, 1e-9):.0f} rows/s"
+        )
+        return table
+
+
+@dataclass
+class QueryCache:
+    """
+    Local Parquet cache of BigQuery query results.
+
+    Results are keyed on a hash of the rendered SQL and the query parameters,
+    so reruns and iterative feature work do not scan BigQuery again until the
+    entry expires. The oldest entries are evicted past the size budget.
+
+    Args:
+        conf (BigQueryConf, optional): The BigQuery operations. Defaults to one on the shared client.
+        cache_dir (str): Local directory of the cached results. Defaults to '.query_cache'.
+        ttl (float): Seconds a result stays fresh. Defaults to one day.
+        max_bytes (int): Size budget of the cache directory. Defaults to 2 GiB.
+    """
+
+    conf: BigQueryConf = None
+    cache_dir: str = ".query_cache"
+    ttl: float = 24 * 60 * 60
+    max_bytes: int = 2 * 1024**3
+
+    def __post_init__(self):
+        if self.conf is None:
+            self.conf = BigQueryConf()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.stats = CacheStats()
+
+    def key(self, sql: str, params: dict = None) -> str:
+        """
+        Cache key of a query.
+
+        Args:
+            sql (str): The rendered SQL.
+            params (dict, optional): The query parameters. Defaults to None.
+
+        Returns:
+            str: The hash of the SQL and parameters.
+        """
+        payload = json.dumps(
+            {"sql": sql, "params": params or {}}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def query(
+        self, sql: str, params: dict = None, ttl: float = None, bypass: bool = False
+    ) -> pd.DataFrame:
+        """
+        Run a query, serving the result from the cache when it is fresh.
+
+        Args:
+            sql (str): The rendered SQL, parameters referenced as @name.
+            params (dict, optional): The query parameters. Defaults to None.
+            ttl (float, optional): Override of the cache TTL in seconds. Defaults to None.
+            bypass (bool, optional): Run the query and refresh the cache entry. Defaults to False.
+
+        Returns:
+            pd.DataFrame: The query result.
+        """
+        path = os.path.join(self.cache_dir, f"{self.key(sql, params)}.parquet")
+        ttl = self.ttl if ttl is None else ttl
+        if not bypass:
+            try:
+                if time.time() - os.stat(path).st_mtime < ttl:
+                    df = pd.read_parquet(path)
+                    self.stats.hits += 1
+                    return df
+            except FileNotFoundError:
+                pass
+
+        if params:
+            job = self.conf.bq_client.query(sql, job_config=_query_job_config(params))
+        else:
+            job = self.conf.bq_client.query(sql)
+        df = job.to_dataframe()
+        self.stats.misses += 1
+
+        # Write under a temporary name so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path)
+            self.stats.bytes_downloaded += os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.stats.evictions += evict_lru(self.cache_dir, self.max_bytes, keep=(path,))
+        return df
+
+    def query_file(
+        self,
+        input_file: Path,
+        params: dict = None,
+        ttl: float = None,
+        bypass: bool = False,
+        **replacements,
+    ) -> pd.DataFrame:
+        """
+        Render a Jinja SQL file and run it through the cache.
+
+        Args:
+            input_file (Path): The SQL template, e.g. src/queries/data_query.sql.
+            params (dict, optional): The query parameters. Defaults to None.
+            ttl (float, optional): Override of the cache TTL in seconds. Defaults to None.
+            bypass (bool, optional): Run the query and refresh the cache entry. Defaults to False.
+            replacements: keyword arguments to use to replace placeholders
+
+        Returns:
+            pd.DataFrame: The query result.
+        """
+        sql = generate_query(input_file, **replacements)
+        return self.query(sql, params=params, ttl=ttl, bypass=bypass)
+
+    def clear(self) -> None:
+        """
+        Remove all cached results.
+        """
+        for name in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir, name))
+
+
+def _query_job_config(params: dict) -> bigquery.QueryJobConfig:
+    """
+    Build the job configuration of a parameterized query.
+
+    Args:
+        params (dict): The query parameters by name.
+
+    Returns:
+        bigquery.QueryJobConfig: The job configuration.
+    """
+    from google.cloud import bigquery
+
+    # bool before int: bool is a subclass of int
+    python_type_to_bigquery_type = [
+        (bool, "BOOL"),
+        (int, "INT64"),
+        (float, "FLOAT64"),
+        (datetime.datetime, "TIMESTAMP"),
+        (datetime.date, "DATE"),
+        (str, "STRING"),
+    ]
+
+    def bigquery_type(value) -> str:
+        return next(
+            (
+                name
+                for kind, name in python_type_to_bigquery_type
+                if isinstance(value, kind)
+            ),
+            "STRING",
+        )
+
+    query_parameters = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            query_parameters.append(
+                bigquery.ArrayQueryParameter(
+                    name, bigquery_type(next(iter(value), "")), list(value)
+                )
+            )
+        else:
+            query_parameters.append(
+                bigquery.ScalarQueryParameter(name, bigquery_type(value), value)
+            )
+    return bigquery.QueryJobConfig(query_parameters=query_parameters)
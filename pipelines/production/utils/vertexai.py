@@ -2,14 +2,15 @@ import os
 from typing import Optional
 
 from dotenv import find_dotenv, load_dotenv
-from google.auth import default, exceptions
-from google.cloud import aiplatform
-
-load_dotenv(find_dotenv())
 
 
 def vertex_authenticate():
     """Authenticate with Google Cloud SDK."""
+    # Deferred so importing this module does not load the aiplatform SDK
+    from google.auth import default, exceptions
+    from google.cloud import aiplatform
+
+    load_dotenv(find_dotenv())
     # Authenticate with Google Cloud SDK
     try:
         credentials, _ = default()
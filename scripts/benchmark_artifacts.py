@@ -0,0 +1,48 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from kfp import dsl
+
+# Requires the pipeline package: pip install -e pipelines/production
+from src.data.loader import DataLoader
+
+# Wide frame similar to the feature sets passed between components
+n_rows, n_columns = 200_000, 200
+rng = np.random.default_rng(0)
+data = pd.DataFrame(
+    rng.random((n_rows, n_columns)), columns=[f"f{i}" for i in range(n_columns)]
+)
+data["segment"] = rng.choice(["a", "b", "c"], size=n_rows)
+projection = ["f0", "f1", "segment"]
+
+writers = {
+    "pickle": DataLoader.save_pickle,
+    "feather": lambda artifact, df: DataLoader.save_artifact(artifact, df, "feather"),
+    "parquet": lambda artifact, df: DataLoader.save_artifact(artifact, df, "parquet"),
+}
+
+with tempfile.TemporaryDirectory() as tmp:
+    print(f"{'format':<10}{'size MB':>10}{'write s':>10}{'read s':>10}{'3 cols s':>10}")
+    for name, write in writers.items():
+        artifact = dsl.Artifact(uri=os.path.join(tmp, name))
+
+        time_start = time.time()
+        write(artifact, data)
+        write_seconds = time.time() - time_start
+
+        time_start = time.time()
+        DataLoader.load_artifact(artifact)
+        read_seconds = time.time() - time_start
+
+        time_start = time.time()
+        DataLoader.load_artifact(artifact, columns=projection)
+        projected_seconds = time.time() - time_start
+
+        size = os.path.getsize(artifact.path) / 1e6
+        print(
+            f"{name:<10}{size:>10.1f}{write_seconds:>10.2f}"
+            f"{read_seconds:>10.2f}{projected_seconds:>10.2f}"
+        )
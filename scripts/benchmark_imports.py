@@ -0,0 +1,56 @@
+import statistics
+import subprocess
+import sys
+
+# Entry points as (working directory, module, budget in seconds)
+# Note: run from the project root
+entry_points = [
+    (".", "utils.pipeline", 0.5),
+    (".", "utils.project", 0.5),
+    ("pipelines/production", "run", 0.5),
+    ("pipelines/production", "definition", 2.0),
+    ("pipelines/production", "src.data.loader", 1.5),
+    ("pipelines/production", "src.features.selection", 1.0),
+    ("pipelines/production", "src.features.hyperparameter", 1.0),
+    ("pipelines/production", "utils.bigquery", 1.0),
+    ("pipelines/production", "utils.vertexai", 0.5),
+    ("pipelines/production", "components.hyperparameter_tuning.definition", 2.0),
+    ("pipelines/production/app", "app", 2.0),
+]
+repeats = 5
+
+snippet = (
+    "import importlib, time; t = time.perf_counter(); "
+    "importlib.import_module({module!r}); print(time.perf_counter() - t)"
+)
+
+over_budget = []
+failed = []
+print(f"{'entry point':<50}{'median s':>10}{'budget s':>10}")
+for cwd, module, budget in entry_points:
+    timings = []
+    for _ in range(repeats):
+        # A fresh interpreter per run so nothing is already imported
+        result = subprocess.run(
+            [sys.executable, "-c", snippet.format(module=module)],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            print(f"{module:<50}{'failed':>10}\n{result.stderr.strip()}")
+            failed.append(module)
+            break
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    else:
+        median = statistics.median(timings)
+        print(f"{module:<50}{median:>10.3f}{budget:>10.1f}")
+        if median > budget:
+            over_budget.append(module)
+
+if failed:
+    print(f"\nFailed to import: {', '.join(failed)}")
+if over_budget:
+    print(f"\nOver budget: {', '.join(over_budget)}")
+if failed or over_budget:
+    sys.exit(1)
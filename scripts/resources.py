@@ -1,14 +1,12 @@
 import os
 
-from dotenv import find_dotenv, load_dotenv
-from google.cloud import artifactregistry, storage
-
+from utils.clients import artifactregistry_client, load_env, storage_client
 from utils.project import ArtifactRegistryConfig, CloudStorageConfig, ProjectConfig
 
 
 pipes = ["training", "deployment"]
 # Set up Project Config
-load_dotenv(find_dotenv())
+load_env()
 project_config = {
     # Environment Variables
     "project_id": os.environ.get("PROJECT_ID"),
@@ -21,27 +19,23 @@ project_config = {
 }
 
 # Initialize Project Config
-project_config = ProjectConfig(config=project_config)
+project = ProjectConfig(config=project_config)
 
 # Enable APIs
-project_config.enable_apis()
-
+project.enable_apis()
 
-# Initialzie Cloud Storage Client
-storage_client = storage.Client()
 
-# Initialize Cloud Storage Config
-cloud_storage_config = CloudStorageConfig(client=storage_client, config=project_config)
+# Initialize Cloud Storage Config with the shared client
+cloud_storage_config = CloudStorageConfig(
+    client=storage_client(), config=project_config
+)
 # Create a bucket and template directories
 cloud_storage_config.create_bucket().template_directories()
 
 
-# Initialize Artifact Registry Client
-artifactregistry_client = artifactregistry.ArtifactRegistryClient()
-
-# Initialize Artifact Registry Config
+# Initialize Artifact Registry Config with the shared client
 artifactregistry_config = ArtifactRegistryConfig(
-    client=artifactregistry_client, config=project_config
+    client=artifactregistry_client(), config=project_config
 )
 
 # Create a repository in Artifact Registry for Docker Image
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The project utilities and the production pipeline package both import from
+# their own directory; `utils` is a namespace package spanning both.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "pipelines", "production")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,28 @@
+"""Stand-ins for the Google Cloud clients, recording the calls they receive."""
+
+import pandas as pd
+
+
+class FakeJob:
+    def __init__(self, result=None, error: Exception = None):
+        self._result = result
+        self._error = error
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self._result
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class FakeQueryClient:
+    """Stands in for bigquery.Client: records the queries it runs."""
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        self.queries.append(sql)
+        return FakeJob(pd.DataFrame({"query": [len(self.queries)] * 100}))
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+from fakes import FakeJob
+from google.cloud import bigquery
+
+from utils.bigquery import BigQueryConf, TableConfig
+
+
+class FakeLoadClient:
+    """Stands in for bigquery.Client: records the table, load, copy and delete jobs."""
+
+    def __init__(self, fail_load: int = None):
+        self.fail_load = fail_load
+        self.created, self.loads, self.copies, self.deleted = {}, [], [], []
+
+    def dataset(self, dataset_id):
+        return bigquery.DatasetReference("project", dataset_id)
+
+    def create_table(self, table):
+        self.created[table.table_id] = table
+        return table
+
+    def load_table_from_file(self, buffer, table_ref, job_config=None, rewind=False):
+        self.loads.append(table_ref.table_id)
+        if len(self.loads) == self.fail_load:
+            return FakeJob(error=RuntimeError("load failed"))
+        return FakeJob()
+
+    def copy_table(self, source, destination, job_config=None):
+        self.copies.append((source.table_id, destination.table_id))
+        return FakeJob()
+
+    def delete_table(self, table_ref, not_found_ok=False):
+        self.deleted.append(table_ref.table_id)
+
+    def get_table(self, table_ref):
+        return table_ref
+
+
+def frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"day": pd.date_range("2024-01-01", periods=rows).date, "a": range(rows)}
+    )
+
+
+def test_bulk_load_single_chunk_loads_into_table():
+    client = FakeLoadClient()
+    conf = BigQueryConf(client=client)
+
+    conf.bulk_load(frame(10), TableConfig("d", "t"), chunk_rows=10)
+
+    assert client.loads == ["t"]
+    assert client.created == {} and client.copies == [] and client.deleted == []
+
+
+def test_bulk_load_chunks_go_through_a_staging_table():
+    client = FakeLoadClient()
+    conf = BigQueryConf(client=client)
+
+    conf.bulk_load(frame(10), TableConfig("d", "t"), chunk_rows=4)
+
+    staging = client.loads[0]
+    assert staging.startswith("t_staging_")
+    assert list(client.created) == [staging]
+    assert client.loads == [staging] * 3
+    assert client.copies == [(staging, "t")]
+    assert client.deleted == [staging]
+
+
+def test_bulk_load_staging_table_has_the_table_partitioning():
+    client = FakeLoadClient()
+    conf = BigQueryConf(client=client)
+    config = TableConfig("d", "t", partitioning_field="day")
+
+    conf.bulk_load(frame(10), config, chunk_rows=4)
+
+    (staging,) = client.created.values()
+    assert staging.time_partitioning.field == "day"
+    assert staging.time_partitioning.type_ == "DAY"
+    assert [field.name for field in staging.schema] == ["day", "a"]
+
+
+def test_bulk_load_failed_chunk_appends_nothing():
+    client = FakeLoadClient(fail_load=2)
+    conf = BigQueryConf(client=client)
+
+    with pytest.raises(RuntimeError):
+        conf.bulk_load(frame(10), TableConfig("d", "t"), chunk_rows=4, max_workers=1)
+
+    assert client.copies == []
+    assert client.deleted == [client.loads[0]]
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from src.data.cache import BlobCache, evict_lru
+
+
+def write(path, size: int) -> str:
+    with open(path, "wb") as file:
+        file.write(b"x" * size)
+    return str(path)
+
+
+@pytest.fixture
+def source(tmp_path):
+    directory = tmp_path / "bucket"
+    directory.mkdir()
+    return directory
+
+
+def test_fetch_hit_and_miss(tmp_path, source):
+    cache = BlobCache(str(tmp_path / "cache"))
+    path = write(source / "a.csv", 10)
+
+    first = cache.fetch(path)
+    second = cache.fetch(path)
+
+    assert first == second
+    assert open(first, "rb").read() == b"x" * 10
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert cache.stats.bytes_downloaded == 10
+
+
+def test_fetch_misses_on_new_version(tmp_path, source):
+    cache = BlobCache(str(tmp_path / "cache"))
+    path = write(source / "a.csv", 10)
+    first = cache.fetch("a.csv", str(source))
+
+    write(source / "a.csv", 20)
+    second = cache.fetch("a.csv", str(source))
+
+    assert first != second
+    assert os.path.getsize(second) == 20
+    assert cache.stats.misses == 2
+
+
+def test_fetch_evicts_least_recently_used(tmp_path, source):
+    cache = BlobCache(str(tmp_path / "cache"), max_bytes=25)
+    paths = [write(source / f"{name}.csv", 10) for name in "abc"]
+
+    entries = [cache.fetch(path) for path in paths]
+
+    assert not os.path.exists(entries[0])
+    assert all(os.path.exists(entry) for entry in entries[1:])
+    assert cache.stats.evictions == 1
+
+
+def test_open_fetches_evicted_entry_again(tmp_path, source):
+    cache = BlobCache(str(tmp_path / "cache"))
+    path = write(source / "a.csv", 10)
+    # Evicted by another process sharing the cache directory
+    os.remove(cache.fetch(path))
+
+    with cache.open(path) as file:
+        assert file.read() == b"x" * 10
+    assert cache.stats.misses == 2
+
+
+def test_evict_lru_keeps_protected_and_temporary_files(tmp_path):
+    old = write(tmp_path / "old", 10)
+    temporary = write(tmp_path / ".partial", 10)
+    new = write(tmp_path / "new", 10)
+    os.utime(old, (0, 0))
+
+    assert evict_lru(str(tmp_path), max_bytes=5, keep=(new,)) == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(new) and os.path.exists(temporary)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from src.processing.dtypes import DtypeOptimizer
+
+
+def data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "small": np.arange(100, dtype=np.int64),
+            "nullable": pd.array([1, None] * 50, dtype="Int64"),
+            "x": np.linspace(0, 1, 100),
+            "city": ["paris", "rome"] * 50,
+            "id": [f"id-{i}" for i in range(100)],
+        }
+    )
+
+
+def test_transform_compacts_the_dtypes():
+    optimizer = DtypeOptimizer(verbose=False).fit(data())
+
+    output = optimizer.transform(data())
+
+    assert output["small"].dtype == np.uint8
+    assert output["nullable"].dtype == "UInt8"
+    assert output["x"].dtype == np.float32
+    assert isinstance(output["city"].dtype, pd.CategoricalDtype)
+    # High cardinality strings are left alone
+    assert output["id"].dtype == data()["id"].dtype
+
+
+def test_later_chunk_with_unseen_categories_keeps_them():
+    optimizer = DtypeOptimizer(verbose=False).fit(data())
+    chunk = data().head(3).assign(city=["paris", "oslo", None])
+
+    output = optimizer.transform(chunk)
+
+    assert output["city"].tolist()[:2] == ["paris", "oslo"]
+    assert output["city"].isna().tolist() == [False, False, True]
+
+
+def test_later_chunk_out_of_the_fitted_range_is_not_truncated():
+    optimizer = DtypeOptimizer(verbose=False).fit(data())
+    chunk = data().head(3).assign(small=[-1, 300, 70_000])
+
+    output = optimizer.transform(chunk)
+
+    assert output["small"].tolist() == [-1, 300, 70_000]
+    assert output["small"].dtype == np.int32
+
+
+def test_inverse_transform_restores_the_original_dtypes():
+    X = data()
+    optimizer = DtypeOptimizer(verbose=False).fit(X)
+
+    restored = optimizer.inverse_transform(optimizer.transform(X))
+
+    assert restored.dtypes.to_dict() == X.dtypes.to_dict()
+    # Exact but for the float32 precision of the floats
+    pd.testing.assert_frame_equal(restored, X, check_exact=False, rtol=1e-6)
+
+
+def test_memory_is_only_measured_when_verbose():
+    quiet = DtypeOptimizer(verbose=False).fit(data())
+    quiet.transform(data())
+    verbose = DtypeOptimizer(verbose=True).fit(data())
+    verbose.transform(data())
+
+    assert not hasattr(quiet, "memory_")
+    assert verbose.memory_["after"] < verbose.memory_["before"]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.features.hyperparameter import Hyperparameter
+
+
+def tuner(queue_path, run_id: str, n_iter: int = 2) -> Hyperparameter:
+    return Hyperparameter(
+        LogisticRegression(),
+        {"C": [0.1, 1.0, 10.0]},
+        str(queue_path),
+        n_iter=n_iter,
+        cv=2,
+        random_state=0,
+        poll_interval=0.01,
+        run_id=run_id,
+    )
+
+
+def data():
+    X = pd.DataFrame(np.random.default_rng(0).random((40, 2)))
+    return X, (X[0] > 0.5).astype(int)
+
+
+def test_new_run_waits_for_its_own_submission(tmp_path):
+    tuner(tmp_path, "run-1").submit()
+
+    with pytest.raises(TimeoutError):
+        tuner(tmp_path, "run-2").queue.wait_submitted(timeout=0.05, poll_interval=0.01)
+
+
+def test_rerun_drops_the_trials_of_the_earlier_run(tmp_path):
+    earlier = tuner(tmp_path, "run-1", n_iter=3)
+    earlier.submit()
+    earlier.queue.claim("dead-worker")
+
+    rerun = tuner(tmp_path, "run-1")
+    rerun.submit()
+
+    assert rerun.queue.pending() == 2
+    assert rerun.queue.requeue(older_than=-1) == []
+
+
+def test_work_and_collect_in_process(tmp_path):
+    X, y = data()
+    hyperparameter = tuner(tmp_path, "run-1")
+    hyperparameter.submit()
+
+    assert hyperparameter.work(X, y, worker_id="worker") == 2
+    results = hyperparameter.collect(timeout=0)
+    assert len(results) == 2
+    assert hyperparameter.best_params_ == results[0]["params"]
@@ -0,0 +1,61 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fakes import FakeJob
+
+from utils.bigquery import BigQueryConf, PartitionReader, TableConfig
+
+
+class FakeRows:
+    def __init__(self, batches):
+        self.batches = batches
+
+    def to_arrow_iterable(self):
+        return iter(self.batches)
+
+
+class FakePartitionClient:
+    """Stands in for bigquery.Client: one batch per partition, its lower bound."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+
+    def query(self, sql, job_config=None):
+        lower = job_config.query_parameters[0].value
+        if self.failures:
+            self.failures -= 1
+            return FakeJob(error=RuntimeError("transient"))
+        batch = pa.RecordBatch.from_pydict({"day": [str(lower)]})
+        return FakeJob(FakeRows([batch]))
+
+
+def test_partition_reader_splits_on_partitions():
+    reader = PartitionReader(
+        TableConfig("d", "t", partitioning_field="day"),
+        conf=BigQueryConf(client=FakePartitionClient()),
+    )
+
+    partitions = reader.partitions("2024-01-01 12:00", "2024-01-03")
+
+    assert partitions == [
+        (pd.Timestamp("2024-01-01 12:00"), pd.Timestamp("2024-01-02")),
+        (pd.Timestamp("2024-01-02"), pd.Timestamp("2024-01-03")),
+    ]
+
+
+def test_partition_reader_reads_partitions_in_order():
+    reader = PartitionReader(
+        TableConfig("d", "t", partitioning_field="day"),
+        conf=BigQueryConf(client=FakePartitionClient(failures=1)),
+        max_workers=2,
+        retries=1,
+    )
+
+    table = reader.read("2024-01-01", "2024-01-06")
+
+    assert table.column("day").to_pylist() == [f"2024-01-0{i}" for i in range(1, 6)]
+
+
+def test_partition_reader_needs_a_partitioning_field():
+    with pytest.raises(ValueError):
+        PartitionReader(TableConfig("d", "t"), conf=BigQueryConf(client=object()))
@@ -0,0 +1,74 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.processing.base import PreprocessingTransformer
+
+
+def data(rows: int = 100) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    x = rng.normal(3.0, 2.0, rows)
+    x[::7] = np.nan
+    return pd.DataFrame(
+        {
+            "x": x,
+            "n": pd.array(rng.integers(0, 10, rows), dtype="Int64"),
+            "c": rng.choice(["a", "b", "c"], rows),
+        }
+    )
+
+
+def chunks(X: pd.DataFrame, size: int):
+    return (X.iloc[i : i + size] for i in range(0, len(X), size))
+
+
+def test_partial_fit_over_chunks_matches_fit():
+    X = data()
+    fitted = PreprocessingTransformer().fit(X)
+    streamed = PreprocessingTransformer().fit_batches(chunks(X, 13))
+
+    np.testing.assert_allclose(streamed.mean_, fitted.mean_)
+    np.testing.assert_allclose(streamed.var_, fitted.var_)
+    np.testing.assert_allclose(fitted.mean_[0], np.nanmean(X["x"]))
+    np.testing.assert_allclose(fitted.var_[0], np.nanvar(X["x"]))
+    np.testing.assert_allclose(streamed.transform(X), fitted.transform(X))
+
+
+def test_missing_values_are_imputed_with_the_mean():
+    X = data()
+    output = PreprocessingTransformer().fit(X).transform(X)
+
+    # Scaled, the imputed mean is zero
+    assert not np.isnan(output).any()
+    assert (output[X["x"].isna().to_numpy(), 0] == 0).all()
+
+
+def test_unknown_and_missing_categories_encode_as_zeros():
+    transformer = PreprocessingTransformer().fit(data())
+    X = data(3).assign(c=["a", "unseen", None])
+
+    output = transformer.transform(X)
+    names = list(transformer.get_feature_names_out())
+    onehot = output[:, [names.index(f"c={c}") for c in "abc"]]
+
+    np.testing.assert_array_equal(onehot, [[1, 0, 0], [0, 0, 0], [0, 0, 0]])
+
+
+def test_unknown_categories_are_minus_one_as_ordinal_codes():
+    transformer = PreprocessingTransformer(encoding="ordinal").fit(data())
+    X = data(2).assign(c=["b", "unseen"])
+
+    codes = transformer.transform(X)[:, -1]
+
+    assert codes[0] >= 0 and codes[1] == -1
+
+
+def test_joblib_round_trip(tmp_path):
+    X = data()
+    transformer = PreprocessingTransformer().fit(X)
+    path = tmp_path / "transformer.joblib"
+    joblib.dump(transformer, path)
+
+    np.testing.assert_array_equal(
+        joblib.load(path).transform(X), transformer.transform(X)
+    )
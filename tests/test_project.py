@@ -0,0 +1,80 @@
+import threading
+
+from utils.project import CloudStorageConfig
+
+SUBDIRECTORIES = 11
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket, self.name = bucket, name
+
+    def upload_from_string(self, data):
+        with self.bucket.lock:
+            self.bucket.objects.add(self.name)
+
+
+class FakeBucket:
+    def __init__(self, objects=()):
+        self.objects = set(objects)
+        self.lock = threading.Lock()
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+
+class FakeBlobs(list):
+    page_number = 1
+
+
+class FakeStorageClient:
+    """Stands in for storage.Client: lists the directory placeholders of a bucket."""
+
+    def __init__(self):
+        self.list_calls = []
+
+    def list_blobs(self, bucket, match_glob=None):
+        self.list_calls.append(match_glob)
+        return FakeBlobs(
+            FakeBlob(bucket, name) for name in bucket.objects if name.endswith("/")
+        )
+
+
+def storage_config(directories, objects=()):
+    return CloudStorageConfig(
+        client=FakeStorageClient(),
+        config={"directories": directories},
+        bucket=FakeBucket(objects),
+    )
+
+
+def test_template_directories_creates_all_placeholders():
+    storage = storage_config("production")
+
+    result = storage.template_directories()
+
+    assert result["created"] == SUBDIRECTORIES
+    assert result["existing"] == 0
+    assert "production/data/05_features/" in storage.bucket.objects
+    assert storage.client.list_calls == ["production/**/"]
+
+
+def test_template_directories_creates_only_missing_ones():
+    storage = storage_config("production", objects={"production/run/"})
+
+    result = storage.template_directories()
+    again = storage.template_directories()
+
+    assert (result["created"], result["existing"]) == (SUBDIRECTORIES - 1, 1)
+    assert (again["created"], again["existing"]) == (0, SUBDIRECTORIES)
+    assert again["api_calls"] == 1
+
+
+def test_template_directories_of_several_pipelines_in_one_listing():
+    storage = storage_config(["production", "staging"])
+
+    result = storage.template_directories()
+
+    assert result["created"] == 2 * SUBDIRECTORIES
+    assert "staging/artifacts/model/" in storage.bucket.objects
+    assert storage.client.list_calls == ["{production,staging}/**/"]
@@ -0,0 +1,71 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+from fakes import FakeQueryClient
+
+from utils.bigquery import BigQueryConf, QueryCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(
+        conf=BigQueryConf(client=FakeQueryClient()), cache_dir=str(tmp_path)
+    )
+
+
+def test_query_cache_hit(cache):
+    first = cache.query("SELECT 1")
+    second = cache.query("SELECT 1")
+
+    pd.testing.assert_frame_equal(first, second)
+    assert len(cache.conf.client.queries) == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_query_cache_keys_on_params(cache):
+    cache.query("SELECT @x", params={"x": 1})
+    cache.query("SELECT @x", params={"x": 2})
+
+    assert len(cache.conf.client.queries) == 2
+
+
+def test_query_cache_ttl_expiry(cache):
+    cache.query("SELECT 1")
+    path = os.path.join(cache.cache_dir, f"{cache.key('SELECT 1')}.parquet")
+    stale = time.time() - cache.ttl - 1
+    os.utime(path, (stale, stale))
+
+    assert cache.query("SELECT 1")["query"].iloc[0] == 2
+    assert cache.query("SELECT 1", ttl=0)["query"].iloc[0] == 3
+    assert cache.stats.misses == 3
+
+
+def test_query_cache_bypass(cache):
+    cache.query("SELECT 1")
+    refreshed = cache.query("SELECT 1", bypass=True)
+
+    assert refreshed["query"].iloc[0] == 2
+    # The bypass refreshed the entry
+    assert cache.query("SELECT 1")["query"].iloc[0] == 2
+    assert len(cache.conf.client.queries) == 2
+
+
+def test_query_cache_eviction(tmp_path):
+    conf = BigQueryConf(client=FakeQueryClient())
+    entry_size = QueryCache(conf=conf, cache_dir=str(tmp_path / "probe"))
+    entry_size.query("SELECT 0")
+    size = entry_size.stats.bytes_downloaded
+    cache = QueryCache(conf=conf, cache_dir=str(tmp_path / "cache"), max_bytes=2 * size)
+
+    for i in range(3):
+        cache.query(f"SELECT {i}")
+        # Distinct ages, the first query is the least recently used
+        path = os.path.join(cache.cache_dir, f"{cache.key(f'SELECT {i}')}.parquet")
+        os.utime(path, (i, i))
+
+    assert cache.stats.evictions == 1
+    assert sorted(os.listdir(cache.cache_dir)) == sorted(
+        f"{cache.key(f'SELECT {i}')}.parquet" for i in (1, 2)
+    )
@@ -0,0 +1,86 @@
+import pandas as pd
+
+from src.features.store import FeatureCache
+
+SNAPSHOT = "2024-01-31"
+
+
+def features(rows: int = 10) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"entity_id": range(rows), "x": [float(i) for i in range(rows)]}
+    )
+
+
+def test_lookup_reads_the_rows_of_the_keys(tmp_path):
+    cache = FeatureCache("f", root=str(tmp_path), version="v1", row_group_size=4)
+    cache.write(features(), SNAPSHOT)
+
+    found = cache.lookup([7, 2, 42], snapshot_date=SNAPSHOT)
+
+    assert found.to_dict("list") == {"entity_id": [2, 7], "x": [2.0, 7.0]}
+
+
+def test_lookup_after_a_version_bump_finds_nothing(tmp_path):
+    FeatureCache("f", root=str(tmp_path), version="v1").write(features(), SNAPSHOT)
+    cache = FeatureCache("f", root=str(tmp_path), version="v2")
+
+    found = cache.lookup([1], snapshot_date=SNAPSHOT)
+
+    assert found.empty
+    assert "entity_id" in found.columns
+    assert cache.read(SNAPSHOT).empty
+    assert list(cache.scan()) == []
+    assert not cache.has(SNAPSHOT)
+
+
+def test_lookup_without_keys_keeps_the_cached_columns(tmp_path):
+    cache = FeatureCache("f", root=str(tmp_path), version="v1")
+    cache.write(features(), SNAPSHOT)
+
+    found = cache.lookup([], snapshot_date=SNAPSHOT)
+
+    assert found.empty
+    assert list(found.columns) == ["entity_id", "x"]
+
+
+def test_get_or_compute_caches_the_features(tmp_path):
+    cache = FeatureCache("f", root=str(tmp_path), version="v1")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return features()
+
+    cache.get_or_compute(SNAPSHOT, compute)
+    cached = cache.get_or_compute(SNAPSHOT, compute)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(cached, features())
+
+
+def test_clear_stale_deletes_the_other_versions(tmp_path):
+    FeatureCache("f", root=str(tmp_path), version="v1").write(features(), SNAPSHOT)
+    cache = FeatureCache("f", root=str(tmp_path), version="v2")
+    cache.write(features(), SNAPSHOT)
+
+    stale = cache.clear_stale()
+
+    assert [path.rsplit("=", 1)[-1] for path in stale] == ["v1"]
+    assert cache.has(SNAPSHOT)
+
+
+def compute_v1() -> pd.DataFrame:
+    return features()
+
+
+def compute_v2() -> pd.DataFrame:
+    return features().assign(y=1.0)
+
+
+def test_version_follows_the_feature_code(tmp_path):
+    first = FeatureCache("f", root=str(tmp_path), code=(compute_v1,))
+    again = FeatureCache("f", root=str(tmp_path), code=(compute_v1,))
+    second = FeatureCache("f", root=str(tmp_path), code=(compute_v2,))
+
+    assert first.version == again.version
+    assert first.version != second.version
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from utils.bigquery import BigQueryConf, TableAppender, TableConfig
+
+
+class RecordingConf(BigQueryConf):
+    """Records the frames loaded by the appender instead of running load jobs."""
+
+    def __init__(self, fail: bool = False):
+        super().__init__(client=object())
+        self.fail = fail
+        self.loads = []
+        self.lock = threading.Lock()
+
+    def load_dataframe(self, df, config):
+        if self.fail:
+            raise RuntimeError("load failed")
+        with self.lock:
+            self.loads.append(df)
+        return len(df)
+
+    def rows(self):
+        with self.lock:
+            return [len(df) for df in self.loads]
+
+
+def rows(n: int) -> pd.DataFrame:
+    return pd.DataFrame({"a": range(n)})
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def appender(conf, **kwargs) -> TableAppender:
+    return TableAppender(TableConfig("d", "t"), conf=conf, **kwargs)
+
+
+def test_max_rows_triggers_one_load():
+    conf = RecordingConf()
+    with appender(conf, max_rows=10, max_latency=60) as buffered:
+        buffered.append(rows(4))
+        assert not wait_until(lambda: conf.loads, timeout=0.2)
+
+        buffered.append(rows(6))
+        assert wait_until(lambda: conf.loads)
+    assert conf.rows() == [10]
+
+
+def test_max_bytes_counts_string_payloads():
+    conf = RecordingConf()
+    with appender(conf, max_bytes=10_000, max_latency=60) as buffered:
+        # 100 rows of 8-byte pointers, but about 100 KB of strings
+        buffered.append(pd.DataFrame({"s": ["x" * 1000] * 100}))
+        assert wait_until(lambda: conf.loads)
+
+
+def test_max_latency_triggers_a_load():
+    conf = RecordingConf()
+    with appender(conf, max_latency=0.2) as buffered:
+        start = time.monotonic()
+        buffered.append(rows(1))
+        assert wait_until(lambda: conf.loads)
+        assert time.monotonic() - start >= 0.2
+
+
+def test_max_latency_after_an_idle_period():
+    conf = RecordingConf()
+    with appender(conf, max_latency=0.2) as buffered:
+        # The thread waits without timeout while the buffer is empty
+        time.sleep(0.3)
+        buffered.append(rows(1))
+        assert wait_until(lambda: conf.loads, timeout=1.0)
+
+
+def test_flush_loads_the_buffer():
+    conf = RecordingConf()
+    with appender(conf, max_latency=60) as buffered:
+        buffered.append(rows(2))
+        buffered.append(rows(3))
+        buffered.flush()
+        assert conf.rows() == [5]
+
+
+def test_flush_raises_on_failed_batches():
+    conf = RecordingConf(fail=True)
+    buffered = appender(conf, max_latency=60)
+    buffered.append(rows(3))
+
+    with pytest.raises(RuntimeError, match=r"1 batches \(3 rows\) failed"):
+        buffered.flush()
+    # Reported once by flush, the next one has nothing new to report
+    buffered.flush()
+
+    with pytest.raises(RuntimeError, match="failed to load"):
+        buffered.close()
+    assert not buffered._thread.is_alive()
+
+
+def test_close_raises_on_failed_batches():
+    conf = RecordingConf(fail=True)
+    buffered = appender(conf, max_latency=60)
+    buffered.append(rows(3))
+
+    with pytest.raises(RuntimeError, match="failed to load"):
+        buffered.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        buffered.append(rows(1))
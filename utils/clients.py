@@ -0,0 +1,36 @@
+from functools import lru_cache
+
+from dotenv import find_dotenv, load_dotenv
+
+# The pipeline image only ships the pipeline directory, which has its own
+# src/clients.py: these are the clients of the project tooling.
+
+
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """Load environment variables from the .env file once per process."""
+    load_dotenv(find_dotenv())
+
+
+@lru_cache(maxsize=None)
+def storage_client():
+    """Cloud Storage client of the project tooling, created on the first call and shared.
+
+    Returns:
+        storage.Client: shared client
+    """
+    from google.cloud import storage
+
+    return storage.Client()
+
+
+@lru_cache(maxsize=None)
+def artifactregistry_client():
+    """Artifact Registry client of the project tooling, created on the first call and shared.
+
+    Returns:
+        artifactregistry.ArtifactRegistryClient: shared client
+    """
+    from google.cloud import artifactregistry
+
+    return artifactregistry.ArtifactRegistryClient()
@@ -0,0 +1,157 @@
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+from utils.components import load_components
+
+
+@dataclass
+class IncrementalCompiler:
+    """Compile the component and pipeline specs of a pipeline that changed.
+
+    Each spec is fingerprinted, for a component from the source of its function,
+    its base image and the kfp version, for the pipeline from its definition and
+    the fingerprints of its components. A spec is recompiled only when its
+    fingerprint differs from the one of the last compilation, kept in
+    `pipelines/<pipe>/.compile_cache.json`, or when its file is missing.
+    Compiling needs no cloud authentication.
+
+    Attributes:
+        pipe (str): name of the pipeline directory in pipelines
+
+    Methods:
+        compile_components(force): compile the component specs that changed
+        compile_pipeline(force): compile the pipeline spec if it changed
+        compile(force): compile both and print the time per spec
+    """
+
+    pipe: str
+
+    def __post_init__(self):
+        self.pipeline_dir = f"pipelines/{self.pipe}"
+        self.cache_path = os.path.join(self.pipeline_dir, ".compile_cache.json")
+        self.cache: Dict[str, str] = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path) as file:
+                self.cache = json.load(file)
+        self.components = load_components(self.pipe)
+        self.timings: Dict[str, float] = {}
+
+    @staticmethod
+    def _hash(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def fingerprint(self, component) -> str:
+        """Fingerprint of a component spec.
+
+        Args:
+            component (PythonComponent): the kfp component
+
+        Returns:
+            str: hash of the function source, the base image and the kfp version
+        """
+        import kfp
+
+        return self._hash(
+            inspect.getsource(component.python_func),
+            component.component_spec.implementation.container.image,
+            kfp.__version__,
+        )
+
+    def _save(self) -> None:
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.cache, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+
+    def _compile(self, name: str, func, package_path: str, fingerprint: str, force):
+        from kfp import compiler
+
+        if (
+            not force
+            and self.cache.get(package_path) == fingerprint
+            and os.path.exists(package_path)
+        ):
+            print(f"Skipping {package_path}: unchanged")
+            return
+        print(f"Compiling {package_path}")
+        time_start = time.time()
+        compiler.Compiler().compile(func, package_path)
+        self.timings[name] = time.time() - time_start
+        self.cache[package_path] = fingerprint
+        self._save()
+
+    def compile_components(self, force: bool = False) -> None:
+        """Compile the component specs whose fingerprint changed.
+
+        Args:
+            force (bool): compile every component
+        """
+        for name, component in self.components.items():
+            # The spec is named after the component directory
+            directory = component.python_func.__module__.split(".")[1]
+            self._compile(
+                name,
+                component,
+                f"{self.pipeline_dir}/components/{directory}.yaml",
+                self.fingerprint(component),
+                force,
+            )
+
+    def compile_pipeline(self, force: bool = False) -> None:
+        """Compile the pipeline spec if its definition or a component changed.
+
+        Args:
+            force (bool): compile even if unchanged
+        """
+        import kfp
+
+        definition_path = f"{self.pipeline_dir}/definition.py"
+        spec = importlib.util.spec_from_file_location("definition", definition_path)
+        definition = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(definition)
+
+        with open(definition_path) as file:
+            source = file.read()
+        fingerprint = self._hash(
+            source,
+            # The pipeline root is read from the environment
+            definition.pipeline.pipeline_spec.default_pipeline_root,
+            kfp.__version__,
+            *[self.fingerprint(c) for _, c in sorted(self.components.items())],
+        )
+        self._compile(
+            "pipeline",
+            definition.pipeline,
+            f"{self.pipeline_dir}/{self.pipe}_pipeline.json",
+            fingerprint,
+            force,
+        )
+
+    def compile(self, force: bool = False) -> Dict[str, float]:
+        """Compile the specs that changed and print the compile time of each.
+
+        Args:
+            force (bool): compile every spec
+
+        Returns:
+            dict: compile time in seconds of each compiled spec
+        """
+        self.compile_components(force=force)
+        self.compile_pipeline(force=force)
+        for name, seconds in self.timings.items():
+            print(f"  {name:<40}{seconds:>8.2f}s")
+        if not self.timings:
+            print(f"All specs of {self.pipe} are up to date")
+        return self.timings
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.compiler <pipe> [--force]
+    IncrementalCompiler(pipe=sys.argv[1]).compile(force="--force" in sys.argv)
@@ -0,0 +1,61 @@
+import hashlib
+import importlib
+import os
+import sys
+from glob import glob
+from typing import Dict
+
+from utils.clients import load_env
+
+
+def load_components(pipe: str) -> Dict[str, object]:
+    """Import the component modules of a pipeline and collect their components.
+
+    The pipeline directory is put on sys.path, as when its scripts run, so the
+    component modules and `src` import the same way they do in the container.
+
+    Args:
+        pipe (str): name of the pipeline directory in pipelines
+
+    Returns:
+        dict: kfp components by function name
+    """
+    from kfp.dsl.python_component import PythonComponent
+
+    load_env()
+    pipeline_dir = os.path.abspath(f"pipelines/{pipe}")
+    if pipeline_dir not in sys.path:
+        sys.path.insert(0, pipeline_dir)
+
+    components = {}
+    for definition in sorted(glob(f"{pipeline_dir}/components/*/definition.py")):
+        name = os.path.basename(os.path.dirname(definition))
+        module = importlib.import_module(f"components.{name}.definition")
+        for attribute in vars(module).values():
+            if isinstance(attribute, PythonComponent):
+                components[attribute.python_func.__name__] = attribute
+    return components
+
+
+def hash_tree(path: str) -> str:
+    """Hash of the files under a directory, ignoring Python caches.
+
+    Args:
+        path (str): file or directory to hash
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256()
+    paths = [path]
+    if os.path.isdir(path):
+        paths = []
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            paths += [os.path.join(root, f) for f in files if not f.endswith(".pyc")]
+    for file_path in sorted(paths):
+        digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
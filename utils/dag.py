@@ -0,0 +1,207 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+from utils.tracing import span
+
+
+@dataclass
+class Step:
+    """A step of a dependency graph.
+
+    Attributes:
+        name (str): Unique name of the step.
+        func (Callable): Function to run, called without arguments.
+        depends_on (list): Names of the steps that must succeed first.
+        retries (int): Number of retries after a failure.
+        estimate (float): Expected duration in seconds, used by the dry run.
+    """
+
+    name: str
+    func: Callable
+    depends_on: List[str] = field(default_factory=list)
+    retries: int = 0
+    estimate: float = 1.0
+
+
+@dataclass
+class StepResult:
+    """Outcome of a step.
+
+    Attributes:
+        name (str): Name of the step.
+        status (str): "succeeded", "failed" or "skipped" when a dependency failed.
+        seconds (float): Wall time of the step including retries.
+        attempts (int): Number of attempts.
+        error (Exception): Last error of a failed step.
+    """
+
+    name: str
+    status: str
+    seconds: float = 0.0
+    attempts: int = 0
+    error: Exception = None
+
+
+@dataclass
+class DagExecutor:
+    """Run steps as a dependency graph on a thread pool.
+
+    A step starts as soon as all of its dependencies have succeeded, so
+    independent steps run in parallel. When a step fails after its retries,
+    every step depending on it is skipped while the rest of the graph runs.
+
+    Attributes:
+        steps (list): Steps of the graph.
+        max_workers (int): Maximum number of steps running at once.
+        name (str): Prefix of the log lines, e.g. the pipeline name.
+
+    Methods:
+        order(): Steps in a topological order.
+        critical_path(): Longest chain of estimated durations.
+        dry_run(): Print the execution plan and the critical path.
+        run(): Execute the graph and return the result of each step.
+    """
+
+    steps: List[Step]
+    max_workers: int = 4
+    name: str = None
+
+    def __post_init__(self):
+        self._steps = {step.name: step for step in self.steps}
+        if len(self._steps) != len(self.steps):
+            raise ValueError("Step names must be unique")
+        for step in self.steps:
+            unknown = set(step.depends_on) - set(self._steps)
+            if unknown:
+                raise ValueError(f"Step {step.name} depends on unknown steps {unknown}")
+        self.order()
+
+    def order(self) -> List[Step]:
+        """Steps in a topological order.
+
+        Returns:
+            list: steps, each after all of its dependencies
+        """
+        ordered, visiting, visited = [], set(), set()
+
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through step {name}")
+            visiting.add(name)
+            for dependency in self._steps[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+            ordered.append(self._steps[name])
+
+        for step in self.steps:
+            visit(step.name)
+        return ordered
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """Longest chain of estimated durations through the graph.
+
+        Returns:
+            tuple: names of the steps on the path and its estimated duration
+        """
+        finish: Dict[str, float] = {}
+        previous: Dict[str, str] = {}
+        for step in self.order():
+            start = 0.0
+            for dependency in step.depends_on:
+                if finish[dependency] > start:
+                    start, previous[step.name] = finish[dependency], dependency
+            finish[step.name] = start + step.estimate
+
+        name = max(finish, key=finish.get)
+        duration, path = finish[name], [name]
+        while name in previous:
+            name = previous[name]
+            path.append(name)
+        return path[::-1], duration
+
+    def dry_run(self) -> None:
+        """Print the execution plan and the critical path without running anything."""
+        print("Execution plan:")
+        for step in self.order():
+            after = ", ".join(step.depends_on) or "-"
+            print(
+                f"  {step.name:<28} after: {after:<50} "
+                f"retries: {step.retries}  estimate: {step.estimate:.0f}s"
+            )
+        path, duration = self.critical_path()
+        print(f"Critical path ({duration:.0f}s): {' -> '.join(path)}")
+
+    def _log(self, message: str) -> None:
+        print(f"[{self.name}] {message}" if self.name else message)
+
+    def _execute(self, step: Step) -> StepResult:
+        time_start = time.time()
+        span_name = f"{self.name}/{step.name}" if self.name else step.name
+        for attempt in range(1, step.retries + 2):
+            try:
+                with span(span_name, attempt=attempt):
+                    step.func()
+                return StepResult(
+                    step.name, "succeeded", time.time() - time_start, attempt
+                )
+            except Exception as error:
+                if attempt > step.retries:
+                    return StepResult(
+                        step.name, "failed", time.time() - time_start, attempt, error
+                    )
+                self._log(f"Step {step.name} failed ({error!r}), retrying...")
+                time.sleep(2 ** (attempt - 1))
+
+    def run(self) -> Dict[str, StepResult]:
+        """Execute the graph.
+
+        Returns:
+            dict: result of each step by name
+
+        Raises:
+            RuntimeError: if a step failed, after the rest of the graph has run
+        """
+        results: Dict[str, StepResult] = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(results) < len(self._steps):
+                for step in self.order():
+                    if step.name in results or step.name in running.values():
+                        continue
+                    statuses = [
+                        results[d].status if d in results else None
+                        for d in step.depends_on
+                    ]
+                    if any(s in ("failed", "skipped") for s in statuses):
+                        self._log(f"Skipping step {step.name}: a dependency failed")
+                        results[step.name] = StepResult(step.name, "skipped")
+                    elif all(s == "succeeded" for s in statuses):
+                        self._log(f"Starting step {step.name}")
+                        # Steps trace as spans of the run that started the graph
+                        context = contextvars.copy_context()
+                        future = executor.submit(context.run, self._execute, step)
+                        running[future] = step.name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[running.pop(future)] = result
+                    self._log(
+                        f"Step {result.name} {result.status} in {result.seconds:.1f}s"
+                        f" after {result.attempts} attempt(s)"
+                    )
+
+        failed = [r for r in results.values() if r.status == "failed"]
+        if failed:
+            raise RuntimeError(
+                "Failed steps: " + ", ".join(f"{r.name} ({r.error!r})" for r in failed)
+            ) from failed[0].error
+        return results
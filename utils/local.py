@@ -0,0 +1,232 @@
+import hashlib
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from utils.components import hash_tree, load_components
+
+
+def _execute(
+    pipeline_dir: str, target: str, arguments: dict, outputs: list, result_path: str
+) -> None:
+    """Run a component function and store its return value and output metadata.
+
+    Args:
+        pipeline_dir (str): pipeline directory to import the component from
+        target (str): "module:function" of the component
+        arguments (dict): arguments of the function, artifacts included
+        outputs (list): names of the output artifact arguments
+        result_path (str): JSON file to write the results to
+    """
+    if pipeline_dir not in sys.path:
+        sys.path.insert(0, pipeline_dir)
+    module_name, function_name = target.rsplit(":", 1)
+    component = getattr(importlib.import_module(module_name), function_name)
+    returned = component.python_func(**arguments)
+    with open(result_path, "w") as file:
+        json.dump(
+            {
+                "return": returned,
+                "metadata": {name: arguments[name].metadata for name in outputs},
+            },
+            file,
+            default=str,
+        )
+
+
+@dataclass
+class StepRun:
+    """Outcome of a component run.
+
+    Attributes:
+        component (str): name of the component function
+        key (str): hash of the component code and inputs
+        cached (bool): whether the outputs of a previous run were reused
+        seconds (float): wall time of the step
+        outputs (dict): output artifacts and paths by name, return value as "Output"
+    """
+
+    component: str
+    key: str
+    cached: bool
+    seconds: float
+    outputs: dict = field(default_factory=dict)
+
+
+@dataclass
+class LocalRunner:
+    """Run the components of a pipeline locally with step caching.
+
+    Each component runs in a subprocess (or in-process) with its artifacts on
+    local disk. A step is skipped, and the outputs of the previous run are
+    returned, when its code hash and input hashes match that run. The code
+    hash covers the component function and the pipeline `src` package.
+
+    Attributes:
+        pipe (str): name of the pipeline directory in pipelines
+        root (str): local directory of the runs and artifacts
+        use_subprocess (bool): run each component in a fresh process
+
+    Methods:
+        run(component, **arguments): run a component, or reuse a cached run
+        report(): print the step timings
+    """
+
+    pipe: str
+    root: str = ".local_runs"
+    use_subprocess: bool = True
+
+    def __post_init__(self):
+        self.pipeline_dir = os.path.abspath(f"pipelines/{self.pipe}")
+        self.components = load_components(self.pipe)
+        self.runs: List[StepRun] = []
+
+    def _fingerprint(self, value) -> object:
+        from kfp import dsl
+
+        if isinstance(value, dsl.Artifact):
+            if value.path and os.path.exists(value.path):
+                return {"artifact": hash_tree(value.path)}
+            return {"artifact": value.uri}
+        return value
+
+    def key(self, component: str, arguments: dict) -> str:
+        """Hash of the component code and its inputs.
+
+        Args:
+            component (str): name of the component function
+            arguments (dict): arguments of the run
+
+        Returns:
+            str: cache key of the run
+        """
+        func = self.components[component].python_func
+        payload = {
+            "component": component,
+            "code": inspect.getsource(func),
+            "src": hash_tree(os.path.join(self.pipeline_dir, "src")),
+            "inputs": {k: self._fingerprint(v) for k, v in sorted(arguments.items())},
+        }
+        serialized = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+    def _load(self, step_dir: str) -> Tuple[dict, dict]:
+        from kfp import dsl
+
+        with open(os.path.join(step_dir, "manifest.json")) as file:
+            manifest = json.load(file)
+        outputs = {"Output": manifest["return"], **manifest["paths"]}
+        for name, artifact in manifest["artifacts"].items():
+            outputs[name] = getattr(dsl, artifact["class"])(
+                name=name, uri=artifact["uri"], metadata=artifact["metadata"]
+            )
+        return manifest, outputs
+
+    def run(self, component: str, **arguments) -> StepRun:
+        """Run a component, or reuse the outputs of a run with the same inputs.
+
+        Args:
+            component (str): name of the component function
+            arguments: inputs of the component, artifacts from previous steps included
+
+        Returns:
+            StepRun: outputs and timing of the step
+        """
+        from kfp.dsl.types import type_annotations
+
+        key = self.key(component, arguments)
+        step_dir = os.path.join(self.root, self.pipe, component, key)
+
+        if os.path.exists(os.path.join(step_dir, "manifest.json")):
+            manifest, outputs = self._load(step_dir)
+            print(
+                f"Skipping {component}: inputs unchanged since a run of "
+                f"{manifest['seconds']:.1f}s ({key})"
+            )
+            step = StepRun(component, key, True, 0.0, outputs)
+            self.runs.append(step)
+            return step
+
+        # Remove leftovers of an interrupted run
+        shutil.rmtree(step_dir, ignore_errors=True)
+        outputs_dir = os.path.abspath(os.path.join(step_dir, "outputs"))
+        os.makedirs(outputs_dir)
+
+        func = self.components[component].python_func
+        kwargs, artifacts, paths = dict(arguments), {}, {}
+        for name, parameter in inspect.signature(func).parameters.items():
+            annotation = parameter.annotation
+            if type_annotations.is_artifact_wrapped_in_Output(annotation):
+                artifact_class = type_annotations.get_io_artifact_class(annotation)
+                kwargs[name] = artifact_class(
+                    name=name, uri=os.path.join(outputs_dir, name)
+                )
+                artifacts[name] = artifact_class.__name__
+            elif isinstance(annotation, type_annotations.OutputPath):
+                kwargs[name] = paths[name] = os.path.join(outputs_dir, name)
+
+        result_path = os.path.join(step_dir, "result.json")
+        target = f"{func.__module__}:{func.__name__}"
+        arguments_ = (self.pipeline_dir, target, kwargs, list(artifacts), result_path)
+        print(f"Running {component} ({key})")
+        time_start = time.time()
+        if self.use_subprocess:
+            process = multiprocessing.get_context("spawn").Process(
+                target=_execute, args=arguments_
+            )
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError(
+                    f"Component {component} failed with exit code {process.exitcode}"
+                )
+        else:
+            _execute(*arguments_)
+        seconds = time.time() - time_start
+
+        with open(result_path) as file:
+            result = json.load(file)
+        manifest = {
+            "component": component,
+            "seconds": seconds,
+            "return": result["return"],
+            "paths": paths,
+            "artifacts": {
+                name: {
+                    "class": artifact_class,
+                    "uri": kwargs[name].uri,
+                    "metadata": result["metadata"][name],
+                }
+                for name, artifact_class in artifacts.items()
+            },
+        }
+        # The manifest is written last: it marks the step as complete
+        with open(os.path.join(step_dir, "manifest.json"), "w") as file:
+            json.dump(manifest, file, default=str)
+
+        _, outputs = self._load(step_dir)
+        step = StepRun(component, key, False, seconds, outputs)
+        self.runs.append(step)
+        return step
+
+    def report(self) -> None:
+        """Print the timings of the steps run so far."""
+        print(f"\n{'component':<40}{'status':<10}{'seconds':>10}  key")
+        for step in self.runs:
+            status = "cached" if step.cached else "ran"
+            print(f"{step.component:<40}{status:<10}{step.seconds:>10.1f}  {step.key}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.local <pipe> [component ...]
+    runner = LocalRunner(pipe=sys.argv[1])
+    for name in sys.argv[2:] or list(runner.components):
+        runner.run(name)
+    runner.report()
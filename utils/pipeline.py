@@ -1,20 +1,23 @@
+import contextvars
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from dotenv import find_dotenv, load_dotenv
-from google.cloud import artifactregistry, storage
+from functools import cached_property
+from typing import Dict, List
 
 
 # specify utils in import for import in main.py
+from utils.clients import artifactregistry_client, load_env, storage_client
+from utils.dag import DagExecutor, Step, StepResult
 from utils.project import (
     ArtifactRegistryConfig,
     CloudStorageConfig,
     ProjectConfig,
     DockerConfig,
+    run_command,
 )
-
-
-# Load environment variables from .env file
-load_dotenv(find_dotenv())
+from utils.tracing import trace
 
 
 @dataclass
@@ -27,8 +30,9 @@ class LazyPipe:
         set_up_storage: Set up the Cloud Storage bucket and template directories.
         set_up_artifact_registry: Set up the Artifact Registry repository.
         create_container: Create the Docker container.
-        define_pipeline: Define the pipeline by running the definition script.
+        define_pipeline: Define the pipeline by compiling the specs that changed.
         run_pipeline: Run the pipeline by running the run script.
+        steps: Declare the process as a dependency graph of steps.
         magic: End-to-end pipeline creation and execution process.
 
     Attributes:
@@ -37,20 +41,21 @@ class LazyPipe:
     Internal Attributes:
         container_args (dict): The arguments for creating the Docker container.
         project_config (dict): The configuration for the project.
-        storage_client (storage.Client): The Cloud Storage client.
-        artifactregistry_client (artifactregistry.ArtifactRegistryClient): The Artifact Registry client.
+        storage_client (storage.Client): The shared Cloud Storage client, created on first use.
+        artifactregistry_client (artifactregistry.ArtifactRegistryClient): The shared Artifact Registry client, created on first use.
         project_config (ProjectConfig): The ProjectConfig instance.
-        artifactregistry_config (ArtifactRegistryConfig): The ArtifactRegistryConfig instance.
-        cloud_storage_config (CloudStorageConfig): The CloudStorageConfig instance.
-        artifactregistry_config (ArtifactRegistryConfig): The ArtifactRegistryConfig instance.
+        cloud_storage_config (CloudStorageConfig): The CloudStorageConfig instance, created on first use.
+        artifactregistry_config (ArtifactRegistryConfig): The ArtifactRegistryConfig instance, created on first use.
     """
 
     pipe: str
 
     def __post_init__(self):
         """
-        Initialize the DockerConfig instance and create the Docker container.
+        Initialize the pipeline configuration.
         """
+        # Load environment variables from .env file
+        load_env()
         self.container_args = {
             self.pipe: {
                 "image_name": self.pipe,
@@ -71,22 +76,30 @@ class LazyPipe:
             # Note: match directory names with pipeline names in pipelines directory
             "directories": self.pipe,
         }
-        # Initialzie Cloud Storage Client
-        self.storage_client = storage.Client()
-        # Initialize Artifact Registry Client
-        self.artifactregistry_client = artifactregistry.ArtifactRegistryClient()
         # Initialize Project Config
         self._project_config = ProjectConfig(config=self.project_config)
-        # Initialize Artifact Registry Config
-        self.artifactregistry_config = ArtifactRegistryConfig(
-            client=self.artifactregistry_client, config=self.project_config
-        )
-        # Initialize Cloud Storage Config
-        self.cloud_storage_config = CloudStorageConfig(
+        # Content hash of the image, pinned while magic runs
+        self._image_tag = None
+
+    # Clients are created on first use, so steps that do not need them
+    # (e.g. building the container) never pay for their construction
+    @cached_property
+    def storage_client(self):
+        return storage_client()
+
+    @cached_property
+    def artifactregistry_client(self):
+        return artifactregistry_client()
+
+    @cached_property
+    def cloud_storage_config(self) -> CloudStorageConfig:
+        return CloudStorageConfig(
             client=self.storage_client, config=self.project_config
         )
-        # Initialize Artifact Registry Config
-        self.artifactregistry_config = ArtifactRegistryConfig(
+
+    @cached_property
+    def artifactregistry_config(self) -> ArtifactRegistryConfig:
+        return ArtifactRegistryConfig(
             client=self.artifactregistry_client, config=self.project_config
         )
 
@@ -116,38 +129,233 @@ class LazyPipe:
         """
         print(f"Creating container with args: {self.container_args[self.pipe]}")
         docker_config = DockerConfig(config=self.container_args[self.pipe])
-        docker_config.create_container()
+        docker_config.create_container(tag=self.image_tag)
+
+    @property
+    def image_tag(self) -> str:
+        """
+        Content hash tag of the pipeline image, pinned as the components base image.
+        Fixed for the duration of a magic run, so the pushed image and the
+        compiled specs always agree.
+        """
+        if self._image_tag is not None:
+            return self._image_tag
+        return DockerConfig(config=self.container_args[self.pipe]).content_hash()
 
     def define_pipeline(self):
         """
-        Define the pipeline by running the definition script.
+        Define the pipeline by compiling the component and pipeline specs that changed.
         """
-        os.system(f"python pipelines/{self.pipe}/definition.py")
+        # A separate process per pipeline: the pipelines share module names
+        run_command(
+            f"IMAGE_TAG={self.image_tag} python -m utils.compiler {self.pipe}",
+            name="compile",
+        )
 
     def run_pipeline(self):
         """
         Run the pipeline by running the run script.
         """
-        os.system(f"python pipelines/{self.pipe}/run.py")
+        run_command(f"python pipelines/{self.pipe}/run.py", name="submit")
 
-    def magic(self, setup: bool = True):
+    def steps(self, setup: bool = True) -> List[Step]:
+        """
+        Declare the end-to-end process as a dependency graph of steps.
+        Args:
+            setup (bool): Whether to set up the resources before running the pipeline.
+        Returns:
+            list: The steps with their dependencies, retries and estimated durations.
+        """
+        steps = [
+            Step("create_container", self.create_container, retries=1, estimate=300),
+            # Compiling the pipeline does not depend on the container or resources
+            Step("define_pipeline", self.define_pipeline, estimate=20),
+            Step(
+                "run_pipeline",
+                self.run_pipeline,
+                depends_on=["create_container", "define_pipeline"],
+                estimate=30,
+            ),
+        ]
+        if setup:
+            steps += [
+                Step("enable_resources", self.enable_resources, retries=1, estimate=60),
+                Step(
+                    "set_up_storage",
+                    self.set_up_storage,
+                    depends_on=["enable_resources"],
+                    retries=2,
+                    estimate=10,
+                ),
+                Step(
+                    "set_up_artifact_registry",
+                    self.set_up_artifact_registry,
+                    depends_on=["enable_resources"],
+                    retries=2,
+                    estimate=10,
+                ),
+            ]
+            # Pushing needs the repository, running needs the pipeline root bucket
+            steps[0].depends_on.append("set_up_artifact_registry")
+            steps[2].depends_on.append("set_up_storage")
+        return steps
+
+    def magic(
+        self, setup: bool = True, dry_run: bool = False, max_workers: int = 4
+    ) -> Dict[str, StepResult]:
         """
         End-to-end pipeline creation and execution process.
+
+        Independent steps run in parallel, each with its own timing and retries.
+        A failed step skips the steps that depend on it. The run is traced:
+        a Chrome trace file is written to .traces and the slowest steps printed.
         Args:
             setup (bool): Whether to set up the resources before running the pipeline.
+            dry_run (bool): Print the execution plan and critical path without running.
+            max_workers (int): The maximum number of steps running at once.
+        Returns:
+            dict: The result of each step.
         Methods:
             enable_resources: Enable the required resources for the pipeline.
             set_up_storage: Set up the Cloud Storage bucket and template directories.
             set_up_artifact_registry: Set up the Artifact Registry repository.
             create_container: Create the Docker container.
-            define_pipeline: Define the pipeline by running the definition script.
+            define_pipeline: Define the pipeline by compiling the specs that changed.
             run_pipeline: Run the pipeline by running the run script.
         """
-        if setup:
-            self.enable_resources()
-            self.set_up_storage()
-            self.set_up_artifact_registry()
+        executor = DagExecutor(
+            steps=self.steps(setup=setup), max_workers=max_workers, name=self.pipe
+        )
+        if dry_run:
+            executor.dry_run()
+            return {}
+        # Hash the build inputs once: create_container and define_pipeline
+        # run concurrently and must use the same tag
+        self._image_tag = None
+        self._image_tag = self.image_tag
+        try:
+            with trace(self.pipe):
+                return executor.run()
+        finally:
+            self._image_tag = None
+
+
+@dataclass
+class MultiPipe:
+    """
+    Concurrent creation and execution of several pipelines.
 
-        self.create_container()
-        self.define_pipeline()
-        self.run_pipeline()
+    The project set up (APIs, bucket, Artifact Registry repository) is shared
+    by all pipelines and done once; the clients are the process-wide ones, so
+    every pipeline reuses them. Containers are then built and pipelines
+    compiled and submitted concurrently.
+
+    Methods:
+        set_up: Set up the shared project resources once for all pipelines.
+        run: Set up, then build and submit the pipelines concurrently.
+        summary: Print the timings and outcome of each pipeline.
+
+    Attributes:
+        pipes (list): The names of the pipelines.
+        max_concurrency (int): The maximum number of pipelines processed at once.
+    """
+
+    pipes: List[str]
+    max_concurrency: int = 2
+
+    def __post_init__(self):
+        self.lazypipes = {pipe: LazyPipe(pipe=pipe) for pipe in self.pipes}
+        self.results: Dict[str, dict] = {}
+
+    def set_up(self) -> Dict[str, StepResult]:
+        """
+        Set up the shared project resources once for all pipelines.
+        Returns:
+            dict: The result of each set up step.
+        """
+        shared = self.lazypipes[self.pipes[0]]
+
+        def set_up_storage():
+            # One provisioning pass for the directories of all pipelines
+            config = {**shared.project_config, "directories": self.pipes}
+            CloudStorageConfig(
+                client=shared.storage_client, config=config
+            ).create_bucket().template_directories()
+
+        steps = [
+            Step("enable_resources", shared.enable_resources, retries=1),
+            Step(
+                "set_up_storage",
+                set_up_storage,
+                depends_on=["enable_resources"],
+                retries=2,
+            ),
+            Step(
+                "set_up_artifact_registry",
+                shared.set_up_artifact_registry,
+                depends_on=["enable_resources"],
+                retries=2,
+            ),
+        ]
+        return DagExecutor(steps=steps, name="set up").run()
+
+    def _run_pipe(self, pipe: str) -> dict:
+        time_start = time.time()
+        try:
+            steps = self.lazypipes[pipe].magic(setup=False)
+            status, error = "succeeded", None
+        except Exception as exception:
+            steps, status, error = {}, "failed", exception
+        return {
+            "status": status,
+            "seconds": time.time() - time_start,
+            "steps": {name: result.seconds for name, result in steps.items()},
+            "error": error,
+        }
+
+    def run(self, setup: bool = True) -> Dict[str, dict]:
+        """
+        Set up the shared resources, then build and submit the pipelines concurrently.
+        Args:
+            setup (bool): Whether to set up the resources before running the pipelines.
+        Returns:
+            dict: The status, duration, step durations and error of each pipeline.
+        Raises:
+            RuntimeError: If any pipeline failed, after the summary of all of them.
+        """
+        with trace("multipipe"):
+            if setup:
+                self.set_up()
+
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                # Each pipeline traces as a span of this run
+                futures = {
+                    pipe: executor.submit(
+                        contextvars.copy_context().run, self._run_pipe, pipe
+                    )
+                    for pipe in self.pipes
+                }
+                self.results = {pipe: f.result() for pipe, f in futures.items()}
+
+        self.summary()
+        failed = {p: r for p, r in self.results.items() if r["status"] == "failed"}
+        if failed:
+            raise RuntimeError(
+                "Failed pipelines: "
+                + ", ".join(f"{pipe} ({r['error']!r})" for pipe, r in failed.items())
+            ) from next(iter(failed.values()))["error"]
+        return self.results
+
+    def summary(self) -> None:
+        """
+        Print the timings and outcome of each pipeline.
+        """
+        print(f"\n{'pipeline':<20}{'status':<12}{'seconds':>10}  steps")
+        for pipe, result in self.results.items():
+            steps = ", ".join(
+                f"{name} {seconds:.1f}s" for name, seconds in result["steps"].items()
+            )
+            print(
+                f"{pipe:<20}{result['status']:<12}{result['seconds']:>10.1f}  "
+                f"{steps or repr(result['error'])}"
+            )
@@ -1,8 +1,44 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
 import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from google.api_core.exceptions import AlreadyExists, Conflict
+from typing import TYPE_CHECKING
+
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from google.cloud import artifactregistry, storage
+
+
+def run_command(cmd: str, name: str = None) -> None:
+    """Run a shell command as a traced span and raise if it fails.
 
-from google.cloud import artifactregistry, storage
+    The output is streamed to stdout and its size recorded with the exit code.
+
+    Args:
+        cmd (str): command to run
+        name (str): name of the span, the program and its subcommand by default
+    """
+    print(f"\nRunning Command:\n{cmd}\n")
+    words = [word for word in cmd.split() if "=" not in word]
+    with span(name or " ".join(words[:2]), cmd=cmd.strip()) as args:
+        process = subprocess.Popen(
+            cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        output_bytes = 0
+        for line in process.stdout:
+            output_bytes += len(line)
+            sys.stdout.write(line.decode(errors="replace"))
+            sys.stdout.flush()
+        exit_code = process.wait()
+        args.update(exit_code=exit_code, output_bytes=output_bytes)
+        if exit_code != 0:
+            raise Exception(f"Command failed with exit code {exit_code}: {cmd}")
 
 
 @dataclass
@@ -28,6 +64,8 @@ class CloudStorageConfig:
         Returns:
             storage.Bucket: created bucket
         """
+        from google.api_core.exceptions import Conflict
+
         try:
             # Create a new bucket
             bucket = self.client.create_bucket(
@@ -54,15 +92,18 @@ class CloudStorageConfig:
 
         return self
 
-    def template_directories(self) -> None:
-        """Create multiple directories in the bucket.
+    def template_directories(self) -> dict:
+        """Create the template directories of one or more pipelines in the bucket.
 
-        Args:
-            bucket (storage.Bucket): bucket to create directories in
+        The existing placeholders are found with a single listing of the
+        root prefixes, only the missing ones are created, concurrently.
+
+        Returns:
+            dict: number of created and existing placeholders and of API calls made and saved
         """
-        print(f"Creating directories in bucket: {self.config['directories']}")
-        root = self.config["directories"]
-        print(f"Creating directory: {root}")
+        roots = self.config["directories"]
+        roots = [roots] if isinstance(roots, str) else list(roots)
+        print(f"Creating directories in bucket: {roots}")
         subdirectories = [
             "run",
             "data/01_raw",
@@ -76,15 +117,35 @@ class CloudStorageConfig:
             "artifacts/model",
             "artifacts/transformer",
         ]
-        for subdirectory in subdirectories:
-            blob = self.bucket.blob(f"{root}/{subdirectory}/")
-            if not blob.exists():
-                print(f"Creating subdirectory: {root}/{subdirectory}")
-                blob.upload_from_string("")
-            else:
-                print(
-                    f"Subdirectory {root}/{subdirectory} already exists. Skipping creation."
-                )
+        placeholders = [f"{root}/{sub}/" for root in roots for sub in subdirectories]
+
+        # One listing, filtered server side to the directory placeholders
+        pattern = roots[0] if len(roots) == 1 else "{" + ",".join(roots) + "}"
+        blobs = self.client.list_blobs(self.bucket, match_glob=f"{pattern}/**/")
+        existing = {blob.name for blob in blobs}
+        list_calls = getattr(blobs, "page_number", 1) or 1
+        missing = [name for name in placeholders if name not in existing]
+
+        def create(name: str) -> None:
+            print(f"Creating subdirectory: {name}")
+            self.bucket.blob(name).upload_from_string("")
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(create, missing))
+
+        # Previously one exists() call per placeholder plus one upload per missing one
+        calls = list_calls + len(missing)
+        saved = len(placeholders) + len(missing) - calls
+        print(
+            f"Created {len(missing)} subdirectories, {len(placeholders) - len(missing)} "
+            f"already existed. {calls} API calls, {saved} saved."
+        )
+        return {
+            "created": len(missing),
+            "existing": len(placeholders) - len(missing),
+            "api_calls": calls,
+            "api_calls_saved": saved,
+        }
 
 
 @dataclass
@@ -113,6 +174,9 @@ class ArtifactRegistryConfig:
         Returns:
             The name of the created repository.
         """
+        from google.api_core.exceptions import AlreadyExists
+        from google.cloud import artifactregistry
+
         # os.system(f"gcloud auth configure-docker {self.config.get('region')}-docker.pkg.dev")
         # REQ: gcloud auth configure-docker europe-west6-docker.pkg.dev
         try:
@@ -140,43 +204,116 @@ class ArtifactRegistryConfig:
 class DockerConfig:
     """Docker configuration.
 
+    Images are tagged with a hash of the build inputs in addition to
+    `image_tag`, so an image whose inputs did not change is neither rebuilt
+    nor pushed again.
+
     Attributes:
         config (dict): Configuration dictionary.
     """
 
     config: dict
 
+    # Files under the pipeline directory that do not end up in the image,
+    # matching .dockerignore: caches, the specs compiled by utils.compiler and
+    # its fingerprints, rewritten by every compilation
+    ignored = ("__pycache__", ".pyc", ".egg-info")
+    compiled = ("*_pipeline.json", "components/*.yaml", ".compile_cache.json")
+
+    @property
+    def repository(self) -> str:
+        """Image path in Artifact Registry, without tag."""
+        return f"{self.config.get('region')}-docker.pkg.dev/{self.config.get('project_id')}/{self.config.get('repository_id')}/{self.config.get('image_name')}"
+
+    def content_hash(self) -> str:
+        """Hash of the build inputs: the Dockerfile and the pipeline directory.
+
+        Returns:
+            str: short hex digest used as image tag
+        """
+        digest = hashlib.sha256()
+        context = os.path.dirname(self.config.get("dockerfile_path"))
+        paths = []
+        for root, dirs, files in os.walk(context):
+            dirs[:] = [d for d in dirs if not d.endswith(self.ignored)]
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), context)
+                if not name.endswith(self.ignored) and not any(
+                    fnmatch.fnmatch(path, pattern) for pattern in self.compiled
+                ):
+                    paths.append(path)
+        # The Dockerfile may live outside the pipeline directory
+        dockerfile = os.path.relpath(self.config.get("dockerfile_path"), context)
+        for path in sorted(set(paths) | {dockerfile}):
+            digest.update(path.encode())
+            with open(os.path.join(context, path), "rb") as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+        return digest.hexdigest()[:12]
+
+    def image_exists(self, tag: str) -> bool:
+        """Whether the registry already has an image with the given tag."""
+        cmd = f"docker manifest inspect {self.repository}:{tag} > /dev/null 2>&1"
+        with span("docker manifest inspect", tag=tag) as args:
+            args["exit_code"] = os.system(cmd)
+        return args["exit_code"] == 0
+
     def build_image(self):
         """Builds a docker image based on the provided configuration."""
         # Build the docker image
         cmd = f"docker build --build-arg PIPELINE_NAME={self.config.get('image_name')} -t {self.config.get('image_name')} -f {self.config.get('dockerfile_path')} ."
-        print(f"\nRunning Command:\n{cmd}\n")
-        os.system(cmd)
+        run_command(cmd)
         return self
 
-    def tag_image(self):
+    def tag_image(self, tag: str = None):
         """Tags a Docker image based on the provided configuration."""
         # Tag the Docker image
-        cmd = f"docker tag {self.config.get('image_name')} {self.config.get('region')}-docker.pkg.dev/{self.config.get('project_id')}/{self.config.get('repository_id')}/{self.config.get('image_name')}:{self.config.get('image_tag')}"
-        print(f"\nRunning Command:\n{cmd}\n")
-        os.system(cmd)
+        cmd = f"docker tag {self.config.get('image_name')} {self.repository}:{tag or self.config.get('image_tag')}"
+        run_command(cmd)
         return self
 
-    def push_image(self):
-        """Push a docker image based on the provided configuration on GCP."""
-        os.system(
-            f"gcloud auth configure-docker {self.config.get('region')}-docker.pkg.dev"
+    def configure_docker(self):
+        """Authenticate docker against the Artifact Registry of the region."""
+        run_command(
+            f"gcloud auth configure-docker {self.config.get('region')}-docker.pkg.dev --quiet"
         )
+        return self
+
+    def push_image(self, tag: str = None):
+        """Push a docker image based on the provided configuration on GCP."""
         # Push the docker image
-        base_image = f"{self.config.get('region')}-docker.pkg.dev/{self.config.get('project_id')}/{self.config.get('repository_id')}/{self.config.get('image_name')}:{self.config.get('image_tag')}"
+        base_image = f"{self.repository}:{tag or self.config.get('image_tag')}"
         cmd = f"docker push {base_image}"
-        print(f"\nRunning Command:\n{cmd}\n")
-        os.system(cmd)
+        run_command(cmd)
         return self
 
-    def create_container(self):
-        """Creates and Push container based on the provided configuration."""
-        self.build_image().tag_image().push_image()
+    def create_container(self, tag: str = None) -> str:
+        """Creates and Push container based on the provided configuration.
+
+        The build and push are skipped when the registry already has the
+        image of the current content hash; `image_tag` is then moved to it.
+
+        Args:
+            tag (str): content hash tag computed by the caller, hashed here if None
+
+        Returns:
+            str: content hash tag of the image
+        """
+        tag = tag or self.content_hash()
+        self.configure_docker()
+        if self.image_exists(tag):
+            print(
+                f"Image {self.repository}:{tag} is up to date. Skipping build and push."
+            )
+            run_command(
+                f"gcloud artifacts docker tags add {self.repository}:{tag} "
+                f"{self.repository}:{self.config.get('image_tag')} --quiet"
+            )
+            return tag
+
+        self.build_image()
+        for image_tag in (tag, self.config.get("image_tag")):
+            self.tag_image(image_tag).push_image(image_tag)
+        return tag
 
 
 @dataclass
@@ -198,7 +335,7 @@ class ProjectConfig:
                            cloudfunctions.googleapis.com \
                            bigquery.googleapis.com
         """
-        print(f"\nRunning Command:\n{cmd}\n")
-        exit_code = os.system(cmd)
-        if exit_code != 0:
-            raise Exception("Failed to run command. Is 'gcloud' installed?")
+        try:
+            run_command(cmd, name="gcloud services enable")
+        except Exception as error:
+            raise Exception("Failed to run command. Is 'gcloud' installed?") from error
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count
+from typing import Iterator, List, Optional
+
+# Active tracer and innermost open span. Context variables follow the code
+# into the threads of an executor when it submits with contextvars.copy_context
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("tracer", default=None)
+_current: ContextVar[Optional[dict]] = ContextVar("span", default=None)
+_ids = count(1)
+
+
+@dataclass
+class Tracer:
+    """Collect the spans of a run and export them as a Chrome trace.
+
+    The trace file can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+    Attributes:
+        name (str): name of the run, prefix of the trace file
+        directory (str): directory of the trace files
+
+    Methods:
+        record(span): add a finished span
+        events(): spans as Chrome trace events
+        write(): write the trace file of the run
+        slowest(n): the n slowest spans below the root
+        summary(n): print the n slowest spans
+    """
+
+    name: str
+    directory: str = ".traces"
+
+    def __post_init__(self):
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.started = datetime.now()
+
+    def record(self, span: dict) -> None:
+        """Add a finished span."""
+        with self._lock:
+            self.spans.append(span)
+
+    def events(self) -> List[dict]:
+        """Spans as complete ("X") Chrome trace events, timestamps in microseconds."""
+        pid = os.getpid()
+        events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name}}
+        ]
+        for span in sorted(self.spans, key=lambda s: s["start"]):
+            events.append(
+                {
+                    "name": span["name"],
+                    "cat": span["status"],
+                    "ph": "X",
+                    "ts": (span["start"] - self._origin) * 1e6,
+                    "dur": (span["end"] - span["start"]) * 1e6,
+                    "pid": pid,
+                    "tid": span["tid"],
+                    "args": {
+                        **span["args"],
+                        "id": span["id"],
+                        "parent": span["parent"],
+                    },
+                }
+            )
+        return events
+
+    def write(self) -> str:
+        """Write the trace file of the run.
+
+        Returns:
+            str: path of the trace file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"{self.name}-{self.started:%Y%m%d%H%M%S}.json"
+        )
+        with open(path, "w") as file:
+            json.dump(
+                {"traceEvents": self.events(), "displayTimeUnit": "ms"},
+                file,
+                default=str,
+            )
+        return path
+
+    def slowest(self, n: int = 5) -> List[dict]:
+        """The n slowest spans below the root span."""
+        spans = [s for s in self.spans if s["parent"] is not None]
+        return sorted(spans, key=lambda s: s["start"] - s["end"])[:n]
+
+    def summary(self, n: int = 5) -> None:
+        """Print the n slowest spans with their status and exit code."""
+        print(f"\nSlowest steps of {self.name}:")
+        for span in self.slowest(n):
+            details = span["status"]
+            if "exit_code" in span["args"]:
+                details += f", exit code {span['args']['exit_code']}"
+            print(
+                f"  {span['name']:<50}{span['end'] - span['start']:>10.1f}s  {details}"
+            )
+
+
+@contextmanager
+def span(name: str, **args) -> Iterator[dict]:
+    """Time a block as a span nested in the current one.
+
+    Without an active tracer the block runs untraced. Attributes set in the
+    yielded `args` dict, e.g. an exit code, are exported with the span.
+
+    Args:
+        name (str): name of the span
+        args: attributes of the span
+
+    Yields:
+        dict: attributes of the span
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield dict(args)
+        return
+
+    parent = _current.get()
+    record = {
+        "id": next(_ids),
+        "name": name,
+        "parent": parent["id"] if parent else None,
+        "tid": threading.get_ident(),
+        "args": dict(args),
+        "status": "ok",
+        "start": time.perf_counter(),
+    }
+    token = _current.set(record)
+    try:
+        yield record["args"]
+    except BaseException as error:
+        record["status"] = "error"
+        record["args"]["error"] = repr(error)
+        raise
+    finally:
+        record["end"] = time.perf_counter()
+        _current.reset(token)
+        tracer.record(record)
+
+
+@contextmanager
+def trace(name: str, directory: str = ".traces", slowest: int = 5) -> Iterator[dict]:
+    """Trace a run, then write its trace file and print its slowest steps.
+
+    Inside an active trace, e.g. a pipeline run by MultiPipe, the block is a
+    span of that trace instead.
+
+    Args:
+        name (str): name of the run
+        directory (str): directory of the trace files
+        slowest (int): number of spans in the summary
+
+    Yields:
+        dict: attributes of the root span
+    """
+    if _tracer.get() is not None:
+        with span(name) as args:
+            yield args
+        return
+
+    tracer = Tracer(name=name, directory=directory)
+    token = _tracer.set(tracer)
+    try:
+        with span(name) as args:
+            yield args
+    finally:
+        _tracer.reset(token)
+        path = tracer.write()
+        tracer.summary(slowest)
+        print(f"Trace written to {path}")